@@ -1,16 +1,38 @@
-import os
-from dotenv import load_dotenv
+import hmac
+from typing import Optional
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-# Load environment variables from .env file (override existing vars)
-load_dotenv(override=True)
+from app.config import settings
 
-API_KEY = os.getenv("API_KEY", "")
+API_KEY = settings.API_KEY
+_API_KEY_B = API_KEY.encode("utf-8")
+_API_KEY_LEN = len(API_KEY)
+_DUMMY_B = b"\0" * len(_API_KEY_B)
+
+# ASGI header names are already lowercased bytes
+_XKEY = b"x-api-key"
 
 security = HTTPBearer(auto_error=False)
 
 
+def _x_api_key(request: Request) -> Optional[str]:
+    """X-API-Key from the raw ASGI header list, without building a Headers mapping."""
+    for name, value in request.scope["headers"]:
+        if name == _XKEY:
+            return value.decode("latin-1")
+    return None
+
+
+def _key_matches(candidate: str) -> bool:
+    """Constant-time API key check that never encodes a wrong-length candidate."""
+    if len(candidate) != _API_KEY_LEN:
+        # Still do a same-length compare so a length mismatch takes the same time
+        hmac.compare_digest(_DUMMY_B, _API_KEY_B)
+        return False
+    return hmac.compare_digest(candidate.encode("utf-8"), _API_KEY_B)
+
+
 async def verify_api_key(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -23,13 +45,13 @@ async def verify_api_key(
     if not API_KEY:
         raise HTTPException(status_code=500, detail="API_KEY not configured")
 
-    # Check Authorization header (Bearer token)
-    if credentials and credentials.credentials == API_KEY:
+    # Check Authorization header (Bearer token); constant-time compare
+    if credentials and _key_matches(credentials.credentials):
         return True
 
-    # Check X-API-Key header
-    x_api_key = request.headers.get("X-API-Key")
-    if x_api_key == API_KEY:
+    # Check X-API-Key header (only reached when the Bearer check did not match)
+    x_api_key = _x_api_key(request)
+    if x_api_key is not None and _key_matches(x_api_key):
         return True
 
     raise HTTPException(status_code=401, detail="Invalid or missing API key")
@@ -0,0 +1,38 @@
+"""
+Application settings, read once from the environment and the .env file.
+
+Import `settings` instead of calling os.getenv / load_dotenv in individual modules.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    # The project-root .env, wherever the app is started from (as load_dotenv's upward search found it)
+    model_config = SettingsConfigDict(env_file=Path(__file__).resolve().parent.parent / ".env", extra="ignore")
+
+    # API key protecting webhook endpoints
+    API_KEY: str = ""
+
+    # FMCSA QCMobile API
+    FMCSA_WEBKEY: str = ""
+    FMCSA_BASE_URL: str = "https://mobile.fmcsa.dot.gov/qc/services"
+    # Local snapshot of top carriers (default: fmcsa_snapshot.sqlite in the project root)
+    FMCSA_SNAPSHOT_PATH: Optional[str] = None
+
+    # SQLite path (default: events.db in the project root)
+    DB_PATH: Optional[str] = None
+
+    # Optional SMTP for handoff emails
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 587
+    SMTP_USER: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_FROM: Optional[str] = None
+    SMTP_USE_TLS: str = "true"
+
+
+settings = Settings()
@@ -0,0 +1,50 @@
+"""
+Public CORS as a tiny ASGI middleware.
+
+The API is open to any origin without credentials, so every response gets the same
+precomputed header; there is no per-request Origin parsing or allow-list matching.
+Preflight requests are answered here without reaching FastAPI routing.
+"""
+
+_ALLOW_ORIGIN = (b"access-control-allow-origin", b"*")
+_PREFLIGHT_HEADERS = [
+    _ALLOW_ORIGIN,
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    (b"content-type", b"text/plain; charset=utf-8"),
+    (b"content-length", b"2"),
+]
+
+
+class PublicCORSMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            requested_headers = None
+            is_preflight = False
+            for name, value in scope["headers"]:
+                if name == b"access-control-request-method":
+                    is_preflight = True
+                elif name == b"access-control-request-headers":
+                    requested_headers = value
+            if is_preflight:
+                headers = list(_PREFLIGHT_HEADERS)
+                if requested_headers:
+                    # Echoed rather than "*": browsers don't let the wildcard cover Authorization
+                    headers.append((b"access-control-allow-headers", requested_headers))
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({"type": "http.response.body", "body": b"OK"})
+                return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), _ALLOW_ORIGIN]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
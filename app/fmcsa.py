@@ -7,29 +7,173 @@ To get an API key:
 3. Go to "My WebKeys" -> "Get a new WebKey"
 4. Fill out the form and get your WebKey
 
-Set the key as environment variable: FMCSA_WEBKEY
+Set the key as environment variable (or in .env): FMCSA_WEBKEY
 """
 
-import os
+import asyncio
+import dataclasses
+import logging
+import operator
+import random
+import time
 import httpx
-from typing import Optional
-from dotenv import load_dotenv
+import orjson
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+from cachetools import TTLCache
 
-# Load environment variables from .env file (override existing vars)
-load_dotenv(override=True)
+from app import fmcsa_snapshot
+from app.http_clients import FMCSA_MAX_KEEPALIVE
+from app.config import settings
 
-FMCSA_BASE_URL = "https://mobile.fmcsa.dot.gov/qc/services"
-FMCSA_WEBKEY = os.getenv("FMCSA_WEBKEY", "")
+logger = logging.getLogger(__name__)
 
+FMCSA_BASE_URL = settings.FMCSA_BASE_URL
+FMCSA_WEBKEY = settings.FMCSA_WEBKEY
 
-async def lookup_carrier_by_mc(mc_number: str) -> dict:
+# Dashes and whitespace inside an MC number, dropped in one pass after the "MC" prefix is removed.
+_MC_STRIP = str.maketrans("", "", "- \t\r\n")
+
+# Carrier data changes on the order of days; cache hits skip the FMCSA round trip.
+# "Not found" answers are kept briefly so typos don't hammer the API.
+_carrier_cache: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+_not_found_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# FMCSA carrier fields we read, extracted in one C-level call after filling defaults.
+_CARRIER_FIELDS = (
+    "legalName", "dbaName", "dotNumber", "allowedToOperate", "outOfService", "carrierOperation",
+    "safetyRating", "safetyRatingDate", "totalDrivers", "totalPowerUnits",
+    "phyStreet", "phyCity", "phyState", "phyZipcode", "phyCountry",
+)
+_CARRIER_DEFAULTS = {**dict.fromkeys(_CARRIER_FIELDS), "allowedToOperate": "N", "outOfService": "N", "carrierOperation": ()}
+_extract_carrier_fields = operator.itemgetter(*_CARRIER_FIELDS)
+
+# Transient failures (connection resets, protocol errors, 429/5xx answers) are retried in-client,
+# which is far cheaper than the workflow re-running the whole verification.
+_FETCH_ATTEMPTS = 3
+_RETRY_INITIAL_WAIT = 0.1
+_RETRY_MAX_WAIT = 2.0
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Circuit breaker: after this many failed lookups within the window, fail fast for the cooldown
+_BREAKER_THRESHOLD = 10
+_BREAKER_WINDOW = 60.0
+_BREAKER_COOLDOWN = 30.0
+
+# Caps batch lookups at the pool's keep-alive size so a large batch can't exhaust the pool.
+_batch_slots = asyncio.Semaphore(FMCSA_MAX_KEEPALIVE)
+
+# In-flight upstream lookups keyed by MC; concurrent callers for the same MC share one request.
+_inflight: dict[str, asyncio.Future] = {}
+
+# Error text of a definitive "no such carrier" answer (404 or empty content), followed by the MC.
+NOT_FOUND_ERROR = "No carrier found with MC number"
+
+_carrier_listeners: list = []
+
+
+class FMCSAUnavailable(Exception):
+    """Raised instead of calling FMCSA while the circuit breaker is open."""
+
+
+class _CircuitBreaker:
+    """
+    Closed: calls go through; failures are counted over a sliding window.
+    Open: calls fail fast until the cooldown passes, then one trial call is let through
+    (half-open) -- success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, threshold: int, window: float, cooldown: float):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._failures: deque[float] = deque()
+        self._opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.cooldown:
+            return False
+        self._opened_at = now  # half-open: this call is the trial; others keep failing fast
+        return True
+
+    def record_success(self):
+        self._failures.clear()
+        self._opened_at = None
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self._opened_at is not None:
+            self._opened_at = now  # trial failed
+            return
+        self._failures.append(now)
+        while now - self._failures[0] > self.window:
+            self._failures.popleft()
+        if len(self._failures) >= self.threshold:
+            self._failures.clear()
+            self._opened_at = now
+
+
+_breaker = _CircuitBreaker(_BREAKER_THRESHOLD, _BREAKER_WINDOW, _BREAKER_COOLDOWN)
+
+
+@dataclass(frozen=True, slots=True)
+class PhysicalAddress:
+    street: Optional[str]
+    city: Optional[str]
+    state: Optional[str]
+    zip: Optional[str]
+    country: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class Carrier:
+    """Carrier fields we use from an FMCSA record. Slotted: cheaper to build and to keep cached than nested dicts."""
+    name: Optional[str]
+    mc_number: str
+    dot_number: Any
+    allowed_to_operate: bool
+    carrier_operation: Any
+    safety_rating: Optional[str]  # uppercased
+    safety_rating_date: Optional[str]
+    total_drivers: Optional[int]
+    total_power_units: Optional[int]
+    physical_address: PhysicalAddress
+    out_of_service: bool
+    raw: Optional[dict] = None  # unmodified FMCSA record, only on the result of a fresh fetch (never cached)
+
+
+def normalize_mc_number(mc_number: str) -> str:
+    """Clean MC number (remove "MC" prefix if present, dashes and whitespace)."""
+    mc_number = mc_number.strip()
+    if mc_number[:2].upper() == "MC":
+        mc_number = mc_number[2:]
+    return mc_number.translate(_MC_STRIP)
+
+
+def add_carrier_listener(listener):
+    """Register a callable run with each Carrier freshly fetched from FMCSA (e.g. to persist profile fields)."""
+    _carrier_listeners.append(listener)
+
+
+async def lookup_carrier_by_mc(mc_number: str, client: httpx.AsyncClient, include_raw: bool = False) -> dict:
     """
     Look up carrier by MC/Docket number using FMCSA QCMobile API.
     
+    client is the shared FMCSA client (see app.http_clients.get_fmcsa_client).
+    
     Returns dict with:
     - found: bool
-    - carrier: dict with name, mc_number, dot_number, allowed_to_operate, etc.
-    - error: str or None
+    - carrier: Carrier with name, mc_number, dot_number, allowed_to_operate, etc.
+      (raw is the unmodified FMCSA record when the answer was fetched from FMCSA for this
+      call or a concurrent one; None when served from the cache or snapshot)
+    - error: str or None (starts with NOT_FOUND_ERROR when FMCSA has no such carrier)
+    
+    include_raw is for debugging: it always goes to FMCSA, bypassing the cache and snapshot,
+    so raw is always set on a found carrier.
     """
     if not FMCSA_WEBKEY:
         return {
@@ -38,87 +182,204 @@ async def lookup_carrier_by_mc(mc_number: str) -> dict:
             "error": "FMCSA_WEBKEY not configured - using mock mode"
         }
     
-    # Clean MC number (remove "MC" prefix if present, strip whitespace)
-    mc_clean = mc_number.strip().upper().replace("MC", "").replace("-", "").strip()
+    mc_clean = normalize_mc_number(mc_number)
+    
+    if include_raw:
+        return await _fetch_carrier(client, mc_clean)
+    
+    cached = _carrier_cache.get(mc_clean) or _not_found_cache.get(mc_clean)
+    if cached is not None:
+        return cached
     
+    # Frequently verified carriers are served from the nightly local snapshot
+    snap = fmcsa_snapshot.get_carrier(mc_clean)
+    if snap is not None:
+        carrier = Carrier(**{**snap, "physical_address": PhysicalAddress(**snap["physical_address"])})
+        result = _carrier_cache[mc_clean] = {"found": True, "carrier": carrier, "error": None}
+        return result
+    
+    fut = _inflight.get(mc_clean)
+    if fut is None:
+        fut = _inflight[mc_clean] = asyncio.ensure_future(_fetch_carrier(client, mc_clean))
+        fut.add_done_callback(lambda _: _inflight.pop(mc_clean, None))
+    # shield: one caller going away must not cancel the lookup the others are waiting on
+    return await asyncio.shield(fut)
+
+
+async def get_docket(client: httpx.AsyncClient, mc_clean: str) -> httpx.Response:
+    """
+    GET the docket-number record for a normalized MC number.
+    
+    Transport errors and 429/5xx answers are retried with jittered exponential backoff; the
+    last response is returned whatever its status. Raises FMCSAUnavailable without calling
+    FMCSA while the circuit breaker is open.
+    """
+    if not _breaker.allow():
+        raise FMCSAUnavailable("FMCSA unavailable")
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Try docket number endpoint first
-            url = f"{FMCSA_BASE_URL}/carriers/docket-number/{mc_clean}"
-            response = await client.get(url, params={"webKey": FMCSA_WEBKEY})
+        response = await _get_docket_with_retry(client, mc_clean)
+    except httpx.HTTPError:
+        _breaker.record_failure()
+        raise
+    if response.status_code in _RETRY_STATUSES:
+        _breaker.record_failure()
+    else:
+        _breaker.record_success()
+    return response
+
+
+async def _get_docket_with_retry(client: httpx.AsyncClient, mc_clean: str) -> httpx.Response:
+    for attempt in range(_FETCH_ATTEMPTS):
+        try:
+            response = await client.get(f"/carriers/docket-number/{mc_clean}")
+            if response.status_code not in _RETRY_STATUSES or attempt == _FETCH_ATTEMPTS - 1:
+                return response
+        except httpx.TimeoutException:
+            raise  # a slow upstream stays slow; don't multiply the caller's wait
+        except httpx.TransportError:
+            if attempt == _FETCH_ATTEMPTS - 1:
+                raise
+        wait = min(_RETRY_MAX_WAIT, _RETRY_INITIAL_WAIT * 2 ** attempt)
+        await asyncio.sleep(wait + random.uniform(0, _RETRY_INITIAL_WAIT))
+
+
+async def _fetch_carrier(client: httpx.AsyncClient, mc_clean: str, notify: bool = True) -> dict:
+    """Query FMCSA for a normalized MC number and cache definitive answers (found carriers go to the listeners if notify)."""
+    try:
+        response = await get_docket(client, mc_clean)
+        
+        if response.status_code == 404:
+            return _not_found(mc_clean)
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            # Well-formed JSON of the wrong shape is as unusable as a parse error (handled below)
+            if not isinstance(data, dict):
+                raise ValueError("FMCSA body is not a JSON object")
+            content = data.get("content") or []
+            if not isinstance(content, list):
+                raise ValueError("FMCSA content is not a list")
             
-            if response.status_code == 200:
-                data = response.json()
-                content = data.get("content", [])
-                
-                if content and len(content) > 0:
-                    carrier_data = content[0].get("carrier", {})
-                    return {
-                        "found": True,
-                        "carrier": {
-                            "name": carrier_data.get("legalName") or carrier_data.get("dbaName"),
-                            "mc_number": mc_clean,
-                            "dot_number": carrier_data.get("dotNumber"),
-                            "allowed_to_operate": carrier_data.get("allowedToOperate", "N") == "Y",
-                            "carrier_operation": carrier_data.get("carrierOperation", []),
-                            "safety_rating": carrier_data.get("safetyRating"),
-                            "safety_rating_date": carrier_data.get("safetyRatingDate"),
-                            "total_drivers": carrier_data.get("totalDrivers"),
-                            "total_power_units": carrier_data.get("totalPowerUnits"),
-                            "physical_address": {
-                                "street": carrier_data.get("phyStreet"),
-                                "city": carrier_data.get("phyCity"),
-                                "state": carrier_data.get("phyState"),
-                                "zip": carrier_data.get("phyZipcode"),
-                                "country": carrier_data.get("phyCountry"),
-                            },
-                            "raw": carrier_data  # Include raw data for debugging
-                        },
-                        "error": None
-                    }
-                else:
-                    return {
-                        "found": False,
-                        "carrier": None,
-                        "error": f"No carrier found with MC number {mc_clean}"
-                    }
+            if content:
+                entry = content[0]
+                carrier_data = entry.get("carrier", {}) if isinstance(entry, dict) else None
+                if not isinstance(carrier_data, dict):
+                    raise ValueError("FMCSA carrier entry is not a JSON object")
+                (legal_name, dba_name, dot_number, allowed, out_of_service, operation, safety_rating,
+                 safety_rating_date, drivers, power_units,
+                 street, city, state, zipcode, country) = _extract_carrier_fields({**_CARRIER_DEFAULTS, **carrier_data})
+                carrier = Carrier(
+                    name=legal_name or dba_name,
+                    mc_number=mc_clean,
+                    dot_number=dot_number,
+                    allowed_to_operate=allowed == "Y",
+                    out_of_service=out_of_service == "Y",
+                    carrier_operation=operation,
+                    # Uppercased once here so eligibility checks compare directly
+                    safety_rating=(safety_rating or "").upper() or None,
+                    safety_rating_date=safety_rating_date,
+                    total_drivers=drivers,
+                    total_power_units=power_units,
+                    physical_address=PhysicalAddress(street, city, state, zipcode, country),
+                )
+                result = _carrier_cache[mc_clean] = {"found": True, "carrier": carrier, "error": None}
+                for listener in _carrier_listeners if notify else ():
+                    try:
+                        listener(carrier)
+                    except Exception:
+                        logger.warning("Carrier listener failed for MC %s", mc_clean, exc_info=True)
+                # The raw record goes to this fetch's callers only; the cached Carrier stays slim
+                return {**result, "carrier": dataclasses.replace(carrier, raw=carrier_data)}
             else:
-                return {
-                    "found": False,
-                    "carrier": None,
-                    "error": f"FMCSA API error: {response.status_code}"
-                }
-                
+                return _not_found(mc_clean)
+        else:
+            return {
+                "found": False,
+                "carrier": None,
+                "error": f"FMCSA API error: {response.status_code}"
+            }
+            
+    except FMCSAUnavailable:
+        return {
+            "found": False,
+            "carrier": None,
+            "error": "FMCSA unavailable"
+        }
     except httpx.TimeoutException:
         return {
             "found": False,
             "carrier": None,
             "error": "FMCSA API timeout"
         }
-    except Exception as e:
+    except httpx.HTTPError:
+        # Lazy formatting: the traceback is only rendered if DEBUG logging is on
+        logger.debug("FMCSA request failed for MC %s", mc_clean, exc_info=True)
+        return {
+            "found": False,
+            "carrier": None,
+            "error": "FMCSA API request failed"
+        }
+    except ValueError:
+        logger.debug("FMCSA returned an unparseable body for MC %s", mc_clean, exc_info=True)
         return {
             "found": False,
             "carrier": None,
-            "error": f"FMCSA API error: {str(e)}"
+            "error": "FMCSA API returned invalid JSON"
         }
 
 
-def is_carrier_eligible(carrier_data: dict) -> tuple[bool, Optional[str]]:
+def _not_found(mc_clean: str) -> dict:
+    """Cache and return the answer for an MC number FMCSA has no carrier for."""
+    result = _not_found_cache[mc_clean] = {
+        "found": False,
+        "carrier": None,
+        "error": f"{NOT_FOUND_ERROR} {mc_clean}"
+    }
+    return result
+
+
+async def lookup_carriers_by_mc(mc_numbers: list[str], client: httpx.AsyncClient) -> list[dict]:
+    """
+    Look up several MC numbers concurrently (at most FMCSA_MAX_KEEPALIVE at a time).
+    Results are in input order.
+    
+    Requests share the HTTP/2 client, so they multiplex over one connection;
+    duplicates within the batch are served by a single upstream call (cache + in-flight dedupe).
+    """
+    return list(await asyncio.gather(*(_bounded(lookup_carrier_by_mc(mc, client)) for mc in mc_numbers)))
+
+
+async def fetch_carriers_by_mc(mc_numbers: list[str], client: httpx.AsyncClient) -> list[dict]:
+    """
+    Fetch normalized MC numbers straight from FMCSA, skipping the cache, the snapshot and the
+    carrier listeners (at most FMCSA_MAX_KEEPALIVE at a time). Results are in input order.
+    
+    For the snapshot refresh, which must not serve itself or write carrier profiles.
+    """
+    return list(await asyncio.gather(*(_bounded(_fetch_carrier(client, mc, notify=False)) for mc in mc_numbers)))
+
+
+async def _bounded(aw):
+    """Await aw while holding one of the batch concurrency slots."""
+    async with _batch_slots:
+        return await aw
+
+
+def is_carrier_eligible(carrier: Optional[Carrier]) -> tuple[bool, Optional[str]]:
     """
     Determine if a carrier is eligible to work with based on FMCSA data.
     
     Returns (eligible: bool, reason: str or None)
     """
-    if not carrier_data:
+    if not carrier:
         return False, "Carrier not found in FMCSA database"
     
     # Check if allowed to operate
-    if not carrier_data.get("allowed_to_operate"):
+    if not carrier.allowed_to_operate:
         return False, "Carrier is not authorized to operate"
     
-    # Check for satisfactory safety rating (if available)
-    safety_rating = carrier_data.get("safety_rating")
-    if safety_rating and safety_rating.upper() == "UNSATISFACTORY":
+    # Check for satisfactory safety rating (if available; stored uppercased)
+    if carrier.safety_rating == "UNSATISFACTORY":
         return False, "Carrier has unsatisfactory safety rating"
     
     # Add more eligibility checks as needed:
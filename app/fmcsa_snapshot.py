@@ -0,0 +1,95 @@
+"""
+Local snapshot of FMCSA records for the most frequently verified carriers.
+
+A small set of carriers accounts for most lookups, so a nightly job copies their
+FMCSA records into a SQLite file and lookup_carrier_by_mc (and so /verify_mc)
+consults it before going to the network. Misses fall through to the API as before.
+
+Refresh (e.g. from cron):
+    python -m app.fmcsa_snapshot --top 500
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+from app.config import settings
+
+SNAPSHOT_PATH = Path(settings.FMCSA_SNAPSHOT_PATH or str(Path(__file__).parent.parent / "fmcsa_snapshot.sqlite"))
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_lock = threading.Lock()
+
+
+def _reader() -> Optional[sqlite3.Connection]:
+    """Shared read-only connection, opened on first use. None when no snapshot exists."""
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None and SNAPSHOT_PATH.exists():
+                _conn = sqlite3.connect(f"file:{SNAPSHOT_PATH}?mode=ro", uri=True, check_same_thread=False)
+    return _conn
+
+
+def get_carrier(mc_clean: str) -> Optional[dict]:
+    """Return the snapshotted carrier fields for a normalized MC number, or None."""
+    conn = _reader()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute("SELECT carrier_json FROM carriers WHERE mc_number = ?", (mc_clean,)).fetchone()
+    except sqlite3.Error:
+        return None  # snapshot missing its table or mid-rebuild; use the API
+    return orjson.loads(row[0]) if row else None
+
+
+def write_snapshot(carriers: list) -> int:
+    """Replace the snapshot contents with the given Carrier objects. Returns rows written."""
+    conn = sqlite3.connect(SNAPSHOT_PATH)
+    try:
+        # WAL so the API process can keep reading while the nightly job writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS carriers (
+                mc_number TEXT PRIMARY KEY,
+                carrier_json BLOB NOT NULL,
+                refreshed_at TEXT NOT NULL
+            )
+        """)
+        now = datetime.utcnow().isoformat()
+        with conn:
+            conn.execute("DELETE FROM carriers")
+            conn.executemany(
+                "INSERT INTO carriers (mc_number, carrier_json, refreshed_at) VALUES (?, ?, ?)",
+                [(c.mc_number, orjson.dumps(dataclasses.replace(c, raw=None)), now) for c in carriers],
+            )
+        return len(carriers)
+    finally:
+        conn.close()
+
+
+async def refresh(top: int) -> int:
+    """Fetch the top-N most verified MC numbers from FMCSA and rewrite the snapshot."""
+    from app import fmcsa, http_clients
+    from app.storage import get_top_mc_numbers
+
+    if not settings.FMCSA_WEBKEY:
+        raise SystemExit("FMCSA_WEBKEY not configured")
+    mc_numbers = get_top_mc_numbers(top)
+    async with http_clients.create_fmcsa_client() as client:
+        results = await fmcsa.fetch_carriers_by_mc(mc_numbers, client)
+    return write_snapshot([r["carrier"] for r in results if r["found"]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the local FMCSA carrier snapshot.")
+    parser.add_argument("--top", type=int, default=500, help="Number of most-verified carriers to keep")
+    args = parser.parse_args()
+    print(f"Wrote {asyncio.run(refresh(args.top))} carriers to {SNAPSHOT_PATH}")
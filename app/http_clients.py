@@ -0,0 +1,35 @@
+"""
+Shared outbound HTTP clients.
+
+One AsyncClient per upstream, created in the app lifespan and reused for every request
+so connections (and TLS sessions) stay warm instead of being re-established per lookup.
+Endpoints get it via Depends(get_fmcsa_client); tests can override that dependency with a
+client built on httpx.MockTransport.
+"""
+
+import httpx
+from fastapi import Request
+
+from app.config import settings
+
+# Keep-alive pool size for FMCSA; batch lookups cap their concurrency at the same number.
+FMCSA_MAX_KEEPALIVE = 20
+
+
+def create_fmcsa_client() -> httpx.AsyncClient:
+    """Create the shared FMCSA client (HTTP/2, pooled keep-alive connections)."""
+    return httpx.AsyncClient(
+        base_url=settings.FMCSA_BASE_URL,
+        # webKey rides along on every request; callers only pass the path
+        params={"webKey": settings.FMCSA_WEBKEY},
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=FMCSA_MAX_KEEPALIVE, max_connections=100),
+        # Per-phase timeouts; no pool timeout so bursts queue for a free connection
+        # instead of failing with PoolTimeout.
+        timeout=httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=None),
+    )
+
+
+def get_fmcsa_client(request: Request) -> httpx.AsyncClient:
+    """FastAPI dependency: the client opened in the app lifespan."""
+    return request.app.state.fmcsa_client
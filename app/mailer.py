@@ -0,0 +1,76 @@
+"""
+Outbound handoff email over SMTP.
+
+One authenticated SMTP session is kept open and reused for every message, so a send costs a
+single MAIL/RCPT/DATA exchange instead of a fresh TCP + STARTTLS + AUTH handshake. Sends are
+serialized on that session; if the server has dropped it in the meantime, it is reopened and
+the message retried once.
+"""
+
+import logging
+import smtplib
+import threading
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SMTP_TIMEOUT = 30.0
+
+_smtp: Optional[smtplib.SMTP] = None
+_smtp_lock = threading.Lock()
+
+
+def is_configured() -> bool:
+    return bool(settings.SMTP_HOST and settings.SMTP_USER and settings.SMTP_PASSWORD)
+
+
+def _open() -> smtplib.SMTP:
+    smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        if settings.SMTP_USE_TLS.lower() in ("true", "1", "yes"):
+            smtp.starttls()
+        smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+def send_email(to_email: str, subject: str, body: str) -> None:
+    """Send a plain-text email on the shared session. Blocking; run it off the event loop."""
+    global _smtp
+    from_addr = settings.SMTP_FROM or settings.SMTP_USER
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = from_addr
+    msg["To"] = to_email
+    msg.attach(MIMEText(body, "plain"))
+    with _smtp_lock:
+        reused = _smtp is not None
+        if _smtp is None:
+            _smtp = _open()
+        try:
+            _smtp.sendmail(from_addr, [to_email], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            _smtp = None
+            if not reused:
+                raise
+            # Idle session timed out server-side; reconnect and retry once
+            _smtp = _open()
+            _smtp.sendmail(from_addr, [to_email], msg.as_string())
+
+
+def close() -> None:
+    """Quit the shared session, if one is open (app shutdown)."""
+    global _smtp
+    with _smtp_lock:
+        if _smtp is not None:
+            try:
+                _smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            _smtp = None
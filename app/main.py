@@ -2,33 +2,54 @@
 FastAPI app for Voice Workflow Builder API.
 /schema returns a unique call_id per request so Get Data gives one ID per call for grouping.
 """
-import os
-import sqlite3
+import asyncio
+import hashlib
+import heapq
+import logging
+import time
 import random
-import json
-import uuid
+import secrets
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache, wraps
 from pathlib import Path
 from typing import Optional
-from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-
-load_dotenv(override=True)
-
+import httpx
+import orjson
+from cachetools import LRUCache
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app import fmcsa, http_clients, mailer
 from app.auth import verify_api_key
+from app.cors import PublicCORSMiddleware
+from app.config import settings
 from app.storage import (
-    DB_PATH,
+    connection as db_connection,
+    init_db as db_init,
+    open_pool as db_open_pool,
+    close_pool as db_close_pool,
     log_event as db_log_event,
+    flush_events as db_flush_events,
+    add_flush_listener as db_add_flush_listener,
+    start_event_writer as db_start_event_writer,
+    stop_event_writer as db_stop_event_writer,
     upsert_carrier_profile,
     get_carrier_profile,
     upsert_call_search_prefs,
     get_call_search_prefs,
-    get_distinct_call_ids,
-    get_events_by_call_id,
+    get_call_event_digest,
+    get_call_event_digests,
+    get_all_call_search_prefs,
+    get_events_version,
+    get_call_versions,
+    count_calls_since,
+    get_stored_call_records,
+    save_call_records,
 )
-from app.fmcsa import lookup_carrier_by_mc, is_carrier_eligible
+from app.fmcsa import normalize_mc_number, lookup_carrier_by_mc
 from app.schemas import (
     Load,
     LoadsResponse,
@@ -43,15 +64,25 @@ from app.schemas import (
     ClassifyCallRequest,
 )
 
-app = FastAPI(title="Voice Workflow Builder API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.fmcsa_client = http_clients.create_fmcsa_client()
+    db_init()
+    db_open_pool()
+    db_start_event_writer()
+    yield
+    await app.state.fmcsa_client.aclose()
+    db_stop_event_writer()
+    db_close_pool()
+    mailer.close()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+app = FastAPI(title="Voice Workflow Builder API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+app.add_middleware(PublicCORSMiddleware)
 
 
 def _effective_call_id(call_id: Optional[str]) -> str:
@@ -80,6 +111,19 @@ async def health():
     return {"ok": True}
 
 
+# Everything in the /schema response except the call_id is constant. Nested dicts are
+# shared across responses; they are only serialized, never mutated.
+_SCHEMA_TEMPLATE = {
+    "call_id": "",
+    "verified": False,
+    "mc_number": "",
+    "carrier": {"legal_name": "", "dot_number": ""},
+    "lane": {"origin": "", "destination": "", "pickup_datetime": "", "equipment_type": ""},
+    "load": None,
+    "outcome": "",
+}
+
+
 @app.get("/schema")
 @app.post("/schema")
 async def get_schema():
@@ -88,77 +132,66 @@ async def get_schema():
     each call to /schema gets a new call_id; use that same call_id in every later webhook
     so all events for that call group together. No auth required.
     """
-    call_id = f"call_{uuid.uuid4().hex[:12]}"
-    return {
-        "call_id": call_id,
-        "verified": False,
-        "mc_number": "",
-        "carrier": {"legal_name": "", "dot_number": ""},
-        "lane": {"origin": "", "destination": "", "pickup_datetime": "", "equipment_type": ""},
-        "load": {"load_id": "", "rate": 0, "call_id": call_id},
-        "outcome": "",
-    }
+    call_id = "call_" + secrets.token_hex(6)
+    return {**_SCHEMA_TEMPLATE, "call_id": call_id, "load": {"load_id": "", "rate": 0, "call_id": call_id}}
+
+
+def _save_carrier_profile(carrier: fmcsa.Carrier):
+    """Keep carrier_profiles in step with each fresh FMCSA answer (cached/snapshot answers are already saved)."""
+    upsert_carrier_profile(carrier.mc_number, {
+        "dot_number": carrier.dot_number,
+        "legal_name": carrier.name,
+        "physical_city": carrier.physical_address.city,
+        "physical_state": carrier.physical_address.state,
+    })
+
+
+fmcsa.add_carrier_listener(_save_carrier_profile)
 
 
 @app.post("/verify_mc", response_model=VerifyMcResponse)
-async def verify_mc(req: VerifyMcRequest, _: bool = Depends(verify_api_key)):
-    import httpx
-    mc_normalized = req.mc_number.strip().upper().replace("MC", "").replace("-", "").strip()
+async def verify_mc(
+    req: VerifyMcRequest,
+    _: bool = Depends(verify_api_key),
+    client: httpx.AsyncClient = Depends(http_clients.get_fmcsa_client),
+):
+    mc_normalized = normalize_mc_number(req.mc_number)
     cid = _effective_call_id(req.call_id)
     db_log_event(cid, "verify_mc_requested", {"mc_number": mc_normalized, "original_input": req.mc_number})
-    fmcsa_webkey = os.getenv("FMCSA_WEBKEY", "")
-    if not fmcsa_webkey:
+    if not settings.FMCSA_WEBKEY:
         result = {"ok": True, "eligible": False, "reason": "FMCSA_WEBKEY not configured", "carrier": None, "raw": None}
-        db_log_event(cid, "verify_mc_result", result)
-        return VerifyMcResponse(**result)
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            url = f"{os.getenv('FMCSA_BASE_URL', 'https://mobile.fmcsa.dot.gov/qc/services')}/carriers/docket-number/{mc_normalized}"
-            response = await client.get(url, params={"webKey": fmcsa_webkey})
-            if response.status_code == 404:
-                result = {"ok": True, "eligible": False, "reason": "MC not found", "carrier": None, "raw": None}
-                db_log_event(cid, "verify_mc_result", result)
-                return VerifyMcResponse(**result)
-            if response.status_code != 200:
-                result = {"ok": True, "eligible": False, "reason": f"FMCSA API error: {response.status_code}", "carrier": None, "raw": None}
-                db_log_event(cid, "verify_mc_result", result)
-                return VerifyMcResponse(**result)
-            data = response.json()
-            content = data.get("content", [])
-            if not content:
-                result = {"ok": True, "eligible": False, "reason": "MC not found", "carrier": None, "raw": data}
-                db_log_event(cid, "verify_mc_result", result)
-                return VerifyMcResponse(**result)
-            carrier_raw = content[0].get("carrier", {})
-            allowed_to_operate = carrier_raw.get("allowedToOperate", "N")
-            out_of_service = carrier_raw.get("outOfService", "N")
-            eligible = (allowed_to_operate == "Y") and (out_of_service != "Y")
-            reason = None
-            if not eligible:
-                reason = "Carrier is not allowed to operate" if allowed_to_operate != "Y" else "Carrier is currently out of service"
-            carrier_obj = {
-                "name": carrier_raw.get("legalName") or carrier_raw.get("dbaName"),
-                "mc_number": mc_normalized,
-                "dot_number": carrier_raw.get("dotNumber"),
-                "allowed_to_operate": allowed_to_operate,
-                "out_of_service": out_of_service,
-                "safety_rating": carrier_raw.get("safetyRating"),
-                "physical_city": carrier_raw.get("phyCity"),
-                "physical_state": carrier_raw.get("phyState"),
-            }
-            upsert_carrier_profile(mc_normalized, {
-                "dot_number": carrier_raw.get("dotNumber"),
-                "legal_name": carrier_raw.get("legalName") or carrier_raw.get("dbaName"),
-                "physical_city": carrier_raw.get("phyCity"),
-                "physical_state": carrier_raw.get("phyState"),
-            })
-            result = {"ok": True, "eligible": eligible, "reason": reason, "carrier": carrier_obj, "raw": carrier_raw}
-            db_log_event(cid, "verify_mc_result", {"mc_number": mc_normalized, "eligible": eligible, "reason": reason, "carrier": carrier_obj})
-            return VerifyMcResponse(**result)
-    except Exception as e:
-        result = {"ok": True, "eligible": False, "reason": str(e), "carrier": None, "raw": None}
-        db_log_event(cid, "verify_mc_result", result)
-        return VerifyMcResponse(**result)
+    else:
+        try:
+            # Cached, snapshot-backed and single-flighted in app.fmcsa; upstream errors are never cached
+            result = _verify_result(await lookup_carrier_by_mc(mc_normalized, client))
+        except Exception as e:
+            result = {"ok": True, "eligible": False, "reason": str(e), "carrier": None, "raw": None}
+    # One result event per request, without the raw FMCSA record (that is only echoed in the response)
+    db_log_event(cid, "verify_mc_result", {"mc_number": mc_normalized, "eligible": result["eligible"], "reason": result["reason"], "carrier": result["carrier"]})
+    return VerifyMcResponse(**result)
+
+
+def _verify_result(lookup: dict) -> dict:
+    """Map a lookup_carrier_by_mc answer to the verify_mc result dict."""
+    carrier = lookup["carrier"]
+    if carrier is None:
+        reason = "MC not found" if lookup["error"].startswith(fmcsa.NOT_FOUND_ERROR) else lookup["error"]
+        return {"ok": True, "eligible": False, "reason": reason, "carrier": None, "raw": None}
+    eligible = carrier.allowed_to_operate and not carrier.out_of_service
+    reason = None
+    if not eligible:
+        reason = "Carrier is not allowed to operate" if not carrier.allowed_to_operate else "Carrier is currently out of service"
+    carrier_obj = {
+        "name": carrier.name,
+        "mc_number": carrier.mc_number,
+        "dot_number": carrier.dot_number,
+        "allowed_to_operate": "Y" if carrier.allowed_to_operate else "N",
+        "out_of_service": "Y" if carrier.out_of_service else "N",
+        "safety_rating": carrier.safety_rating,
+        "physical_city": carrier.physical_address.city,
+        "physical_state": carrier.physical_address.state,
+    }
+    return {"ok": True, "eligible": eligible, "reason": reason, "carrier": carrier_obj, "raw": carrier.raw}
 
 
 @app.post("/log_event")
@@ -185,9 +218,10 @@ async def call_output(req: CallOutputRequest, _: bool = Depends(verify_api_key))
 
 @app.post("/handoff_context")
 async def handoff_context(req: HandoffContextRequest, _: bool = Depends(verify_api_key)):
-    db_log_event(_effective_call_id(req.call_id), "handoff_initiated", req.model_dump())
-    parts = [f"Carrier: {req.carrier_name}", f"MC#: {req.mc_number}", f"Load: {req.load_id}", f"Route: {req.origin} → {req.destination}", f"Agreed Rate: ${req.agreed_rate}", f"Pickup: {req.pickup_datetime}", f"Notes: {req.notes}"]
-    return {"ok": True, "summary": " | ".join(p for p in parts if p), "context": req.model_dump()}
+    context = req.model_dump()  # dumped once: logged and echoed back
+    db_log_event(_effective_call_id(req.call_id), "handoff_initiated", context)
+    parts = [f"Carrier: {context['carrier_name']}", f"MC#: {context['mc_number']}", f"Load: {context['load_id']}", f"Route: {context['origin']} → {context['destination']}", f"Agreed Rate: ${context['agreed_rate']}", f"Pickup: {context['pickup_datetime']}", f"Notes: {context['notes']}"]
+    return {"ok": True, "summary": " | ".join(p for p in parts if p), "context": context}
 
 
 @app.post("/classify_call")
@@ -199,19 +233,8 @@ async def classify_call(req: ClassifyCallRequest, _: bool = Depends(verify_api_k
 @app.post("/set_call_search_prefs")
 async def set_call_search_prefs(req: SetCallSearchPrefsRequest, _: bool = Depends(verify_api_key)):
     cid = _effective_call_id(req.call_id)
-    updates = {k: v for k, v in req.model_dump().items() if k != "call_id" and v is not None}
-    if req.origin_city is not None: updates["origin_city"] = req.origin_city
-    if req.origin_state is not None: updates["origin_state"] = req.origin_state
-    if req.destination_city is not None: updates["destination_city"] = req.destination_city
-    if req.destination_state is not None: updates["destination_state"] = req.destination_state
-    if req.equipment_type is not None: updates["equipment_type"] = req.equipment_type
-    if req.weight_capacity is not None: updates["weight_capacity"] = safe_number_convert(req.weight_capacity, int)
-    if req.min_temp is not None: updates["min_temp"] = safe_number_convert(req.min_temp, float)
-    if req.max_temp is not None: updates["max_temp"] = safe_number_convert(req.max_temp, float)
-    if req.notes is not None: updates["notes"] = req.notes
-    if req.pickup_date is not None: updates["pickup_date"] = req.pickup_date
-    if req.departure_date is not None: updates["departure_date"] = req.departure_date
-    if req.latest_departure_date is not None: updates["latest_departure_date"] = req.latest_departure_date
+    # Numeric fields arrive already converted (see SetCallSearchPrefsRequest validators)
+    updates = req.model_dump(exclude={"call_id"}, exclude_none=True)
     prefs = upsert_call_search_prefs(cid, updates)
     db_log_event(cid, "call_search_prefs_updated", updates)
     return {"ok": True, "prefs": prefs}
@@ -231,10 +254,12 @@ def generate_fake_loads(prefs: dict) -> list:
     eq = prefs.get("equipment_type") or "Van"
     weight = prefs.get("weight_capacity") or 45000
     miles = random.randint(400, 1200)
+    # Rates drawn up front and sorted (best first), so the loads come out in order
+    rates = sorted((round(miles * (2.0 + random.random() * 0.5)) for _ in range(3)), reverse=True)
+    now = datetime.utcnow()
     loads = []
-    for i in range(3):
-        rate = round(miles * (2.0 + random.random() * 0.5))
-        pickup = datetime.utcnow() + timedelta(days=random.randint(1, 5))
+    for rate in rates:
+        pickup = now + timedelta(days=random.randint(1, 5))
         delivery = pickup + timedelta(days=random.randint(1, 3))
         loads.append({
             "load_id": f"LOAD-{random.randint(100000, 999999)}",
@@ -248,7 +273,6 @@ def generate_fake_loads(prefs: dict) -> list:
             "commodity_type": "General",
             "miles": miles,
         })
-    loads.sort(key=lambda x: x["loadboard_rate"], reverse=True)
     return loads
 
 
@@ -260,7 +284,8 @@ async def find_loads(call_id: str = Query(...), _: bool = Depends(verify_api_key
     prefs = dict(prefs)
     loads = generate_fake_loads(prefs)
     db_log_event(_effective_call_id(call_id), "loads_found", {"count": len(loads), "origin_city": prefs.get("origin_city"), "destination_city": prefs.get("destination_city"), "equipment_type": prefs.get("equipment_type")})
-    return {"ok": True, "call_id": call_id, "loads": loads}
+    # Loads are plain JSON-native dicts: encode them directly instead of via jsonable_encoder
+    return ORJSONResponse({"ok": True, "call_id": call_id, "loads": loads})
 
 
 @app.get("/get_best_load")
@@ -275,7 +300,7 @@ async def get_best_load(call_id: str = Query(...), _: bool = Depends(verify_api_
     if not best:
         raise HTTPException(status_code=404, detail="No loads found")
     db_log_event(_effective_call_id(call_id), "best_load_retrieved", {"load_id": best["load_id"], "rate": best["loadboard_rate"], "origin": best["origin"], "destination": best["destination"]})
-    return {"ok": True, "call_id": call_id, "load": best}
+    return ORJSONResponse({"ok": True, "call_id": call_id, "load": best})
 
 
 @app.post("/submit_load")
@@ -295,73 +320,127 @@ async def submit_load(req: SubmitLoadRequest, _: bool = Depends(verify_api_key))
 
 # ---------- Live data & call summary ----------
 
+# The dashboard polls /api/live-data every few seconds, possibly from several tabs: one
+# computation serves every poll within the TTL. Newly written events drop the cache.
+_LIVE_DATA_TTL = 1.0
+_live_data_cache: Optional[tuple[float, bytes, str]] = None  # (computed_at, body, etag)
+
+
+def _drop_live_data_cache():
+    global _live_data_cache
+    _live_data_cache = None
+
+
+db_add_flush_listener(_drop_live_data_cache)
+
+
 @app.get("/api/live-data")
-async def get_live_data():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, call_id, event_type, payload, timestamp FROM events ORDER BY id DESC LIMIT 20")
-    events = [dict(row) for row in cursor.fetchall()]
-    cursor.execute("SELECT call_id, mc_number, origin_city, origin_state, destination_city, destination_state, equipment_type, departure_date, updated_at FROM call_search_prefs ORDER BY id DESC LIMIT 10")
-    calls = [dict(row) for row in cursor.fetchall()]
-    cursor.execute("SELECT mc_number, legal_name, physical_city, physical_state, equipment_type, updated_at FROM carrier_profiles ORDER BY id DESC LIMIT 10")
-    carriers = [dict(row) for row in cursor.fetchall()]
-    cursor.execute("SELECT COUNT(*) as total FROM events")
-    total_events = cursor.fetchone()["total"]
-    cursor.execute("SELECT COUNT(*) as total FROM call_search_prefs")
-    total_calls = cursor.fetchone()["total"]
-    conn.close()
-    return {"timestamp": datetime.utcnow().isoformat(), "stats": {"total_events": total_events, "total_calls": total_calls, "total_carriers": len(carriers)}, "recent_events": events, "active_calls": calls, "carriers": carriers}
-
-
-def _parse_payload(payload_str):
-    if not payload_str:
-        return None
-    try:
-        return json.loads(payload_str)
-    except Exception:
-        return None
+async def get_live_data(request: Request):
+    global _live_data_cache
+    cached = _live_data_cache
+    if cached is None or time.monotonic() - cached[0] >= _LIVE_DATA_TTL:
+        data = await _live_data()
+        # Tagged without the timestamp, which changes on every computation: unchanged data
+        # keeps its ETag across recomputations, so the dashboard's revalidations get a 304.
+        etag = '"' + hashlib.blake2b(orjson.dumps(data), digest_size=8).hexdigest() + '"'
+        body = orjson.dumps({"timestamp": datetime.utcnow().isoformat(), **data})
+        cached = _live_data_cache = (time.monotonic(), body, etag)
+    _, body, etag = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+# Independent reads; each runs on its own pooled connection so they overlap (WAL allows
+# concurrent readers) and the endpoint waits for the slowest instead of the sum.
+_LIVE_EVENTS_SQL = "SELECT id, call_id, event_type, payload, timestamp FROM events ORDER BY id DESC LIMIT 20"
+_LIVE_CALLS_SQL = "SELECT call_id, mc_number, origin_city, origin_state, destination_city, destination_state, equipment_type, departure_date, updated_at FROM call_search_prefs ORDER BY id DESC LIMIT 10"
+_LIVE_CARRIERS_SQL = "SELECT mc_number, legal_name, physical_city, physical_state, equipment_type, updated_at FROM carrier_profiles ORDER BY id DESC LIMIT 10"
+
+
+async def _live_data():
+    await run_in_threadpool(db_flush_events)
+    events, calls, carriers, total_events, total_calls = await asyncio.gather(
+        run_in_threadpool(_query_dicts, _LIVE_EVENTS_SQL),
+        run_in_threadpool(_query_dicts, _LIVE_CALLS_SQL),
+        run_in_threadpool(_query_dicts, _LIVE_CARRIERS_SQL),
+        run_in_threadpool(_query_scalar, "SELECT COUNT(*) FROM events"),
+        run_in_threadpool(_query_scalar, "SELECT COUNT(*) FROM call_search_prefs"),
+    )
+    return {"stats": {"total_events": total_events, "total_calls": total_calls, "total_carriers": len(carriers)}, "recent_events": events, "active_calls": calls, "carriers": carriers}
+
+
+def _query_dicts(sql: str) -> list:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples; dicts are zipped against the column names once per query
+        return _fetch_dicts(cursor, sql)
+
 
+def _query_scalar(sql: str):
+    with db_connection() as conn:
+        return conn.execute(sql).fetchone()[0]
 
-def _payload_as_dict(raw):
-    """Normalize stored payload to a dict. Handles double-encoded JSON (payload sent as string)."""
-    if raw is None:
+
+def _fetch_dicts(cursor, sql: str) -> list:
+    """Run sql on a tuple-row cursor and return the rows as dicts."""
+    cursor.execute(sql)
+    cols = [c[0] for c in cursor.description]
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+
+def _parse_payload(payload_str) -> dict:
+    """Decode a stored payload. Payloads are stored unwrapped (see storage.log_event); non-objects read as {}."""
+    if not payload_str:
         return {}
-    if isinstance(raw, dict):
-        return raw
-    if isinstance(raw, str):
-        parsed = _parse_payload(raw)
-        if isinstance(parsed, dict):
-            return parsed
-        if isinstance(parsed, str):
-            return _payload_as_dict(parsed)  # one more level of encoding
+    try:
+        payload = orjson.loads(payload_str)
+    except orjson.JSONDecodeError:
         return {}
-    return {}
+    return payload if isinstance(payload, dict) else {}
 
 
 @app.get("/api/call-summary")
 async def get_call_summary():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT call_id FROM events WHERE event_type IN ('verify_mc_result', 'negotiation_complete') ORDER BY id DESC LIMIT 1")
-    primary = cursor.fetchone()
-    if primary:
-        call_id = primary["call_id"]
-    else:
-        cursor.execute("SELECT call_id FROM events ORDER BY id DESC LIMIT 1")
-        latest = cursor.fetchone()
-        if not latest:
-            conn.close()
-            return {"ok": True, "call_id": None, "carrier_summary": "No calls yet.", "load_summary": "No load data yet.", "outcome_summary": "No negotiation outcome yet.", "sentiment_summary": "No sentiment captured yet."}
-        call_id = latest["call_id"]
-
-    def get_latest_event(event_type: str):
-        cursor.execute("SELECT payload, timestamp FROM events WHERE call_id = ? AND (event_type = ? OR event_type = ?) ORDER BY id DESC LIMIT 1", (call_id, event_type, f'"{event_type}"'))
-        return cursor.fetchone()
-
-    verify_row = get_latest_event("verify_mc_result")
-    verify_payload = _parse_payload(verify_row["payload"]) if verify_row else {}
+    return await run_in_threadpool(_call_summary)
+
+
+# Target call (latest verified/negotiated, else latest of any kind), the latest payload per
+# event type for it (event types may arrive JSON-quoted), plus the latest sentiment of any
+# call as a fallback -- all in one round trip.
+_CALL_SUMMARY_SQL = """
+    WITH target AS (
+        SELECT COALESCE(
+            (SELECT call_id FROM events WHERE event_type IN ('verify_mc_result', 'negotiation_complete') ORDER BY id DESC LIMIT 1),
+            (SELECT call_id FROM events ORDER BY id DESC LIMIT 1)
+        ) AS call_id
+    ),
+    latest AS (
+        SELECT TRIM(event_type, '"') AS kind, payload,
+               ROW_NUMBER() OVER (PARTITION BY TRIM(event_type, '"') ORDER BY id DESC) AS rn
+        FROM events
+        WHERE call_id = (SELECT call_id FROM target)
+          AND event_type IN ('verify_mc_result', 'negotiation_complete', 'best_load_retrieved', 'sentiment_classified',
+                             '"verify_mc_result"', '"negotiation_complete"', '"best_load_retrieved"', '"sentiment_classified"')
+    )
+    SELECT target.call_id, latest.kind, latest.payload FROM target LEFT JOIN latest ON latest.rn = 1
+    UNION ALL
+    SELECT (SELECT call_id FROM target), 'sentiment_orphan', payload FROM (
+        SELECT payload FROM events WHERE event_type IN ('sentiment_classified', '"sentiment_classified"') ORDER BY id DESC LIMIT 1
+    )
+"""
+
+
+def _call_summary():
+    db_flush_events()
+    with db_connection() as conn:
+        rows = conn.execute(_CALL_SUMMARY_SQL).fetchall()
+    call_id = rows[0]["call_id"]
+    if call_id is None:
+        return {"ok": True, "call_id": None, "carrier_summary": "No calls yet.", "load_summary": "No load data yet.", "outcome_summary": "No negotiation outcome yet.", "sentiment_summary": "No sentiment captured yet."}
+    latest = {row["kind"]: row["payload"] for row in rows if row["kind"] is not None}
+
+    verify_payload = _parse_payload(latest.get("verify_mc_result"))
     carrier = verify_payload.get("carrier") or {}
     eligible = verify_payload.get("eligible")
     mc_number = carrier.get("mc_number") or verify_payload.get("mc_number") or "Unknown"
@@ -373,10 +452,8 @@ async def get_call_summary():
     dot_number = carrier.get("dot_number")
     carrier_summary = f"Carrier {carrier_name} (MC {mc_number}" + (f", DOT {dot_number}" if dot_number else "") + f"). Eligible: {eligible}." if eligible is not None else "Eligibility not recorded."
 
-    negotiation_row = get_latest_event("negotiation_complete")
-    negotiation_payload = _parse_payload(negotiation_row["payload"]) if negotiation_row else {}
-    best_load_row = get_latest_event("best_load_retrieved")
-    best_load_payload = _parse_payload(best_load_row["payload"]) if best_load_row else {}
+    negotiation_payload = _parse_payload(latest.get("negotiation_complete"))
+    best_load_payload = _parse_payload(latest.get("best_load_retrieved"))
     load_data = negotiation_payload if negotiation_payload else best_load_payload
     load_summary = "No load data yet."
     if load_data:
@@ -395,38 +472,40 @@ async def get_call_summary():
     outcome_summary = "No negotiation outcome yet."
     if negotiation_payload:
         outcome_summary = f"Outcome: accepted={negotiation_payload.get('accepted')}. Final price ${negotiation_payload.get('final_price')}. Rounds: {negotiation_payload.get('negotiation_rounds')}."
-    sentiment_row = get_latest_event("sentiment_classified")
-    sentiment_payload = _parse_payload(sentiment_row["payload"]) if sentiment_row else None
+    sentiment_payload = _parse_payload(latest.get("sentiment_classified"))
     if not sentiment_payload or not (sentiment_payload.get("sentiment_classification") or sentiment_payload.get("sentiment")):
-        cursor.execute("SELECT payload, timestamp FROM events WHERE event_type = ? OR event_type = ? ORDER BY id DESC LIMIT 1", ("sentiment_classified", '"sentiment_classified"'))
-        orphan = cursor.fetchone()
-        if orphan:
-            try:
-                sentiment_payload = _parse_payload(orphan["payload"])
-            except Exception:
-                pass
+        sentiment_payload = _parse_payload(latest.get("sentiment_orphan"))
     sentiment = (sentiment_payload or {}).get("sentiment_classification") or (sentiment_payload or {}).get("sentiment")
     reasoning = (sentiment_payload or {}).get("sentiment_reasoning")
     sentiment_summary = f"Sentiment: {sentiment}. Reason: {reasoning}" if sentiment else "No sentiment captured yet."
-    conn.close()
     call_id_hint = None
     if call_id in ("string", "unknown", "") or (isinstance(call_id, str) and call_id.strip() in ("string", "unknown", "")):
         call_id_hint = "Use the real call identifier from your voice session (e.g. from Web Call / Get Data), not a literal like 'string'."
     return {"ok": True, "call_id": call_id, "carrier_summary": carrier_summary, "load_summary": load_summary, "outcome_summary": outcome_summary, "sentiment_summary": sentiment_summary, "call_id_hint": call_id_hint}
 
 
+# Exact labels seen from the voice workflow; anything else falls back to substring checks.
+_SENTIMENT_LABELS = {
+    **dict.fromkeys(("positive", "professional & satisfied", "friendly & cooperative", "really positive", "very positive"), "positive"),
+    "neutral": "neutral",
+    **dict.fromkeys(("negative", "unprofessional", "really negative", "very negative"), "negative"),
+    **dict.fromkeys(("frustrated", "impatient", "dismissive", "angry"), "frustrated"),
+}
+
+
 def _normalize_sentiment(raw):
     if not raw:
         return "neutral"
-    s = (raw or "").strip().lower()
-    if s in ("positive", "professional & satisfied", "friendly & cooperative", "really positive", "very positive"):
-        return "positive"
-    if s in ("neutral",):
-        return "neutral"
-    if s in ("negative", "unprofessional", "really negative", "very negative"):
-        return "negative"
-    if s in ("frustrated", "impatient", "dismissive", "angry"):
-        return "frustrated"
+    return _normalize_sentiment_label(raw)
+
+
+@lru_cache(maxsize=256)
+def _normalize_sentiment_label(raw: str) -> str:
+    """Map a free-form sentiment label to positive/neutral/negative/frustrated. Labels repeat, so cached."""
+    s = raw.strip().lower()
+    label = _SENTIMENT_LABELS.get(s)
+    if label is not None:
+        return label
     if "positive" in s:
         return "positive"
     if "negative" in s:
@@ -436,19 +515,124 @@ def _normalize_sentiment(raw):
     return "neutral"
 
 
+# Reasoning arrives under many keys (webhook "Response Reasoning" → sentiment_reasoning, etc.),
+# checked in priority order; some webhook builders nest it under payload/data/body.
+_REASONING_KEYS = (
+    "sentiment_reasoning", "reasoning", "response_reasoning", "sentimentReasoning",
+    "reason", "why", "explanation", "Response Reasoning", "Sentiment_Reasoning"
+)
+_NESTED_PAYLOAD_KEYS = ("payload", "data", "body")
+
+
+def _first_reasoning(root: dict) -> Optional[str]:
+    """First non-empty reasoning string in root or its nested payloads (depth-first, nested JSON strings decoded)."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        for k in _REASONING_KEYS:
+            v = d.get(k)
+            if isinstance(v, str) and v.strip():
+                return v.strip()
+        # Pushed in reverse so "payload" is searched (fully) before "data", then "body"
+        for nested in reversed(_NESTED_PAYLOAD_KEYS):
+            sub = d.get(nested)
+            if isinstance(sub, str):
+                sub = _parse_payload(sub)
+            if sub and isinstance(sub, dict):
+                stack.append(sub)
+    return None
+
+
+# Event types whose latest payload feeds a call record
+_CALL_RECORD_EVENT_TYPES = (
+    "verify_mc_result", "negotiation_complete", "best_load_retrieved", "sentiment_classified",
+    "call_classified", "call_completed", "log_event",
+)
+
+
 def _build_call_record(call_id: str):
-    events = get_events_by_call_id(call_id)
-    if not events:
+    digest = get_call_event_digest(call_id, _CALL_RECORD_EVENT_TYPES)
+    if digest is None:
         return None
-    by_type = {}
-    for e in events:
-        key = (e["event_type"] or "").strip().strip('"')
-        if key:
-            by_type[key] = {"payload": _parse_payload(e["payload"]), "timestamp": e["timestamp"]}
-    first_ts = events[0]["timestamp"]
-    last_ts = events[-1]["timestamp"]
+    return _assemble_call_record(call_id, digest, get_call_search_prefs(call_id))
+
+
+# Assembled records keyed by call_id, with the newest event id each was built from and the
+# record's lowercased search text: a call is only re-assembled after it gets a new event.
+# Cached records are shared; don't mutate them.
+_call_record_cache: LRUCache = LRUCache(maxsize=4096)
+# Past this many changed calls, one unfiltered digest query beats a long IN list
+_DIGEST_IN_LIST_MAX = 500
+# Bump whenever _assemble_call_record or _call_search_text changes output, so rows stored in
+# call_records by older code are rebuilt instead of served
+_CALL_RECORD_FORMAT = 1
+
+
+def _call_search_text(rec: dict) -> str:
+    """Lowercased text matched by /api/calls?q= (MC, carrier, load and search-pref fields)."""
+    load = rec.get("load_matched") or {}
+    prefs = rec.get("call_search_prefs") or {}
+    return " ".join([str(rec.get("mc_number") or ""), str(rec.get("carrier_name") or ""), str(load.get("load_id") or ""), str(load.get("origin") or ""), str(load.get("destination") or ""), str(prefs.get("origin_city") or ""), str(prefs.get("destination_city") or ""), str(prefs.get("equipment_type") or "")]).lower()
+
+
+def _call_record_entries() -> list:
+    """
+    (record, search_text) for every call, most recent first. One cheap query finds each call's
+    newest event id; calls that changed since this process cached them are first looked up in
+    the call_records projection (shared across workers and restarts), and only calls missing
+    there are re-read from events (one digest query, one prefs query), re-assembled and written
+    back. Calls whose record fails to assemble are skipped.
+    """
+    versions = get_call_versions()
+    stale = [cid for cid, version in versions.items() if (_call_record_cache.get(cid) or (None,))[0] != version]
+    fresh = {}
+    if stale:
+        in_list = None if len(stale) > _DIGEST_IN_LIST_MAX else stale
+        rebuild = []
+        stored = get_stored_call_records(in_list, _CALL_RECORD_FORMAT)
+        for call_id in stale:
+            row = stored.get(call_id)
+            if row is not None and row[0] == versions[call_id]:
+                fresh[call_id] = _call_record_cache[call_id] = (row[0], orjson.loads(row[1]), row[2])
+            else:
+                rebuild.append(call_id)
+        if rebuild:
+            digests = get_call_event_digests(_CALL_RECORD_EVENT_TYPES, None if len(rebuild) > _DIGEST_IN_LIST_MAX else rebuild)
+            prefs_by_call = get_all_call_search_prefs()
+            rows = []
+            for call_id in rebuild:
+                digest = digests.get(call_id)
+                if digest is None:
+                    continue
+                try:
+                    rec = _assemble_call_record(call_id, digest, prefs_by_call.get(call_id))
+                except Exception:
+                    continue
+                search_text = _call_search_text(rec)
+                fresh[call_id] = _call_record_cache[call_id] = (versions[call_id], rec, search_text)
+                rows.append((call_id, versions[call_id], _CALL_RECORD_FORMAT, orjson.dumps(rec), search_text))
+            save_call_records(rows)
+    entries = []
+    for call_id, version in versions.items():
+        entry = fresh.get(call_id) or _call_record_cache.get(call_id)
+        if entry is not None and entry[0] == version:
+            entries.append(entry[1:])
+    return entries
+
+
+def _build_call_records() -> list:
+    """Records for every call, most recent first (see _call_record_entries)."""
+    return [rec for rec, _ in _call_record_entries()]
+
+
+def _assemble_call_record(call_id: str, digest: tuple, prefs_row: Optional[dict]) -> dict:
+    """Build the dashboard call record from an event digest (see storage.get_call_event_digest)."""
+    first_ts, last_ts, by_type = digest
+    for latest in by_type.values():
+        latest["payload"] = _parse_payload(latest["payload"])
     try:
-        duration_seconds = max(0, int((datetime.fromisoformat(last_ts.replace("Z", "+00:00")) - datetime.fromisoformat(first_ts.replace("Z", "+00:00"))).total_seconds()))
+        # Python 3.11+ fromisoformat accepts the trailing "Z" directly
+        duration_seconds = max(0, int((datetime.fromisoformat(last_ts) - datetime.fromisoformat(first_ts)).total_seconds()))
     except Exception:
         duration_seconds = 0
     # Prefer workflow-reported call length (e.g. from classify_call) over event span
@@ -469,9 +653,9 @@ def _build_call_record(call_id: str):
     verification_status = "failed" if eligible is False else ("verified" if eligible is True else "pending")
     neg = (by_type.get("negotiation_complete") or {}).get("payload") or {}
     if not neg and by_type.get("call_completed"):
-        neg = _payload_as_dict((by_type.get("call_completed") or {}).get("payload"))
+        neg = by_type["call_completed"]["payload"]
     if not neg and by_type.get("log_event"):
-        _le = _payload_as_dict((by_type.get("log_event") or {}).get("payload"))
+        _le = by_type["log_event"]["payload"]
         if _le and (_le.get("load_id") or _le.get("origin") or _le.get("accepted") is not None):
             neg = _le
     best_load = (by_type.get("best_load_retrieved") or {}).get("payload") or {}
@@ -509,13 +693,12 @@ def _build_call_record(call_id: str):
         fallback_rate = negotiation.get("initial_offer") or negotiation.get("final_rate")
         if fallback_rate is not None and fallback_rate > 0:
             load_matched["loadboard_rate"] = fallback_rate
-    # Normalize so we always have dicts (handles payload stored as double-encoded JSON string)
-    sentiment_row = _payload_as_dict((by_type.get("sentiment_classified") or {}).get("payload"))
-    classified_row = _payload_as_dict((by_type.get("call_classified") or {}).get("payload"))
+    sentiment_row = (by_type.get("sentiment_classified") or {}).get("payload") or {}
+    classified_row = classified
     if not classified_row and by_type.get("call_completed"):
-        classified_row = _payload_as_dict((by_type.get("call_completed") or {}).get("payload"))
+        classified_row = by_type["call_completed"]["payload"]
     if not classified_row and by_type.get("log_event"):
-        _le = _payload_as_dict((by_type.get("log_event") or {}).get("payload"))
+        _le = by_type["log_event"]["payload"]
         if _le and (_le.get("load_id") or _le.get("origin") or _le.get("accepted") is not None):
             classified_row = _le
     # Outcome: prefer explicit outcome from call_classified/call_completed, else derive from neg/verification
@@ -552,39 +735,7 @@ def _build_call_record(call_id: str):
         or classified_row.get("sentiment")
     )
     sentiment_tone = sentiment_row.get("tone") or classified_row.get("tone")
-    # Extract reasoning from many possible keys (webhook "Response Reasoning" → sentiment_reasoning, etc.)
-    _reasoning_keys = (
-        "sentiment_reasoning", "reasoning", "response_reasoning", "sentimentReasoning",
-        "reason", "why", "explanation", "Response Reasoning", "Sentiment_Reasoning"
-    )
-    def _first_reasoning(d: dict) -> Optional[str]:
-        if not isinstance(d, dict):
-            return None
-        for k in _reasoning_keys:
-            v = d.get(k)
-            if isinstance(v, str) and v.strip():
-                return v.strip()
-        # Nested payload (e.g. payload.payload from some webhook builders)
-        for nested in ("payload", "data", "body"):
-            sub = d.get(nested)
-            if sub is None:
-                continue
-            if isinstance(sub, dict):
-                found = _first_reasoning(sub)
-                if found:
-                    return found
-            if isinstance(sub, str):
-                try:
-                    parsed = json.loads(sub)
-                    if isinstance(parsed, dict):
-                        found = _first_reasoning(parsed)
-                        if found:
-                            return found
-                except Exception:
-                    pass
-        return None
     sentiment_reasoning = _first_reasoning(sentiment_row) or _first_reasoning(classified_row)
-    prefs_row = get_call_search_prefs(call_id)
     call_search_prefs = None
     if prefs_row and isinstance(prefs_row, dict):
         call_search_prefs = {"origin_city": prefs_row.get("origin_city"), "origin_state": prefs_row.get("origin_state"), "destination_city": prefs_row.get("destination_city"), "destination_state": prefs_row.get("destination_state"), "equipment_type": prefs_row.get("equipment_type"), "weight_capacity": safe_number_convert(prefs_row.get("weight_capacity"), int), "min_temp": safe_number_convert(prefs_row.get("min_temp")), "max_temp": safe_number_convert(prefs_row.get("max_temp")), "notes": prefs_row.get("notes"), "pickup_date": prefs_row.get("pickup_date"), "departure_date": prefs_row.get("departure_date"), "latest_departure_date": prefs_row.get("latest_departure_date")}
@@ -607,36 +758,34 @@ def _format_handoff_email(rec: dict) -> tuple:
     duration_str = f"{duration // 60}m {duration % 60}s" if isinstance(duration, (int, float)) and duration >= 0 else "—"
     reasoning = rec.get("sentiment_reasoning") or "No reasoning provided."
     subject = f"Call handoff: {carrier} ({outcome}) — {call_id}"
-    lines = [
-        f"Call handoff summary — {call_id}",
-        "",
-        "— Carrier —",
-        f"Carrier: {carrier}",
-        f"MC#: {mc}",
-        f"Verification: {rec.get('verification_status') or '—'}",
-        "",
-        "— Outcome —",
-        f"Outcome: {outcome}",
-        f"Sentiment: {sentiment}",
-        f"Duration: {duration_str}",
-        f"Reasoning: {reasoning}",
-        "",
-        "— Load —",
-        f"Lane: {lane}",
-        f"Load ID: {load.get('load_id') or '—'}",
-        f"Rate: {rate_str}",
-        f"Equipment: {load.get('equipment_type') or '—'}",
-        f"Pickup: {load.get('pickup_datetime') or '—'}",
-        f"Delivery: {load.get('delivery_datetime') or '—'}",
-        "",
-        "— Negotiation —",
-        f"Rounds: {neg.get('rounds') or 0}",
-        f"Final rate: ${neg['final_rate']:,.0f}" if neg.get("final_rate") is not None else "Final rate: —",
-        f"Agreed: {neg.get('agreed')}",
-        "",
-        "View full details in the Call Log.",
-    ]
-    body = "\n".join(lines)
+    final_rate_str = f"${neg['final_rate']:,.0f}" if neg.get("final_rate") is not None else "—"
+    body = f"""Call handoff summary — {call_id}
+
+— Carrier —
+Carrier: {carrier}
+MC#: {mc}
+Verification: {rec.get('verification_status') or '—'}
+
+— Outcome —
+Outcome: {outcome}
+Sentiment: {sentiment}
+Duration: {duration_str}
+Reasoning: {reasoning}
+
+— Load —
+Lane: {lane}
+Load ID: {load.get('load_id') or '—'}
+Rate: {rate_str}
+Equipment: {load.get('equipment_type') or '—'}
+Pickup: {load.get('pickup_datetime') or '—'}
+Delivery: {load.get('delivery_datetime') or '—'}
+
+— Negotiation —
+Rounds: {neg.get('rounds') or 0}
+Final rate: {final_rate_str}
+Agreed: {neg.get('agreed')}
+
+View full details in the Call Log."""
     return subject, body
 
 
@@ -662,39 +811,29 @@ async def handoff_summary(call_id: str, _: bool = Depends(verify_api_key)):
     return {"call_id": call_id, "subject": subject, "body": body}
 
 
+def _send_email_sync(to_email: str, subject: str, body: str) -> None:
+    """Background task: send via the shared SMTP session, logging failures."""
+    try:
+        mailer.send_email(to_email, subject, body)
+    except Exception:
+        logger.exception("Handoff email to %s failed", to_email)
+
+
 @app.post("/send_handoff_email")
-async def send_handoff_email(req: SendHandoffEmailRequest, _: bool = Depends(verify_api_key)):
-    """Build handoff summary and optionally send to sales rep. Set SMTP_* env vars to send."""
+async def send_handoff_email(req: SendHandoffEmailRequest, background_tasks: BackgroundTasks, _: bool = Depends(verify_api_key)):
+    """
+    Build handoff summary and optionally send to sales rep. Set SMTP_* env vars to send.
+    Sending happens after the response ("sent": "queued"); SMTP failures are logged.
+    """
     rec = _build_call_record(req.call_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Call not found")
     subject, body = _format_handoff_email(rec)
     subject = (req.subject or "").strip() or subject
     out = {"ok": True, "call_id": req.call_id, "to_email": req.to_email, "subject": subject, "body": body, "sent": False}
-    smtp_host = os.environ.get("SMTP_HOST")
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_pass = os.environ.get("SMTP_PASSWORD")
-    if smtp_host and smtp_user and smtp_pass:
-        try:
-            import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-            port = int(os.environ.get("SMTP_PORT", "587"))
-            from_addr = os.environ.get("SMTP_FROM") or smtp_user
-            use_tls = os.environ.get("SMTP_USE_TLS", "true").lower() in ("true", "1", "yes")
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = from_addr
-            msg["To"] = req.to_email
-            msg.attach(MIMEText(body, "plain"))
-            with smtplib.SMTP(smtp_host, port) as smtp:
-                if use_tls:
-                    smtp.starttls()
-                smtp.login(smtp_user, smtp_pass)
-                smtp.sendmail(from_addr, [req.to_email], msg.as_string())
-            out["sent"] = True
-        except Exception as e:
-            out["error"] = str(e)
+    if mailer.is_configured():
+        background_tasks.add_task(_send_email_sync, req.to_email, subject, body)
+        out["sent"] = "queued"
     else:
         out["message"] = "SMTP not configured (set SMTP_HOST, SMTP_USER, SMTP_PASSWORD). Summary returned for use in workflow."
     return out
@@ -702,26 +841,20 @@ async def send_handoff_email(req: SendHandoffEmailRequest, _: bool = Depends(ver
 
 @app.get("/api/calls")
 async def api_list_calls(q: Optional[str] = Query(None), outcome: Optional[str] = Query(None), sentiment: Optional[str] = Query(None)):
-    call_ids = get_distinct_call_ids()
+    # Search text is built once per call when its record is assembled, not on every request
+    needle = q.lower() if q else None
     records = []
-    for cid in call_ids:
-        try:
-            rec = _build_call_record(cid)
-        except Exception:
-            continue
-        if not rec:
-            continue
+    for rec, search_text in _call_record_entries():
         if outcome and rec.get("outcome") != outcome:
             continue
         if sentiment and rec.get("sentiment") != sentiment:
             continue
-        if q:
-            prefs = rec.get("call_search_prefs") or {}
-            haystack = " ".join([str(rec.get("mc_number") or ""), str(rec.get("carrier_name") or ""), str((rec.get("load_matched") or {}).get("load_id") or ""), str((rec.get("load_matched") or {}).get("origin") or ""), str((rec.get("load_matched") or {}).get("destination") or ""), str(prefs.get("origin_city") or ""), str(prefs.get("destination_city") or ""), str(prefs.get("equipment_type") or "")]).lower()
-            if q.lower() not in haystack:
-                continue
+        if needle and needle not in search_text:
+            continue
         records.append(rec)
-    return records
+    # Records hold only JSON-native values; returning the response directly skips FastAPI's
+    # jsonable_encoder walk over every record before orjson encodes it.
+    return ORJSONResponse(records)
 
 
 @app.get("/api/calls/{call_id}")
@@ -729,66 +862,84 @@ async def api_get_call(call_id: str):
     rec = _build_call_record(call_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Call not found")
-    return rec
+    return ORJSONResponse(rec)
 
 
-def _parse_timestamp_safe(ts) -> Optional[datetime]:
-    """Return timezone-aware UTC datetime or None if ts is missing or invalid."""
-    if ts is None or (isinstance(ts, str) and not ts.strip()):
-        return None
-    try:
-        s = str(ts).replace("Z", "+00:00")
-        dt = datetime.fromisoformat(s)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt
-    except (ValueError, TypeError):
-        return None
+# Held while a cached dashboard endpoint recomputes: polls that miss together (several tabs)
+# wait for one rebuild instead of each running their own, and rebuilds of the different
+# endpoints don't touch the call-record memo from several threads at once.
+_dashboard_rebuild_lock = asyncio.Lock()
+
+
+def _cached_while_events_unchanged(ttl: float, empty: dict):
+    """
+    Cache a no-argument endpoint's result while no new event has been written, for at most ttl
+    seconds (the TTL bounds staleness from prefs/profile edits, which aren't events).
+    The dashboard polls these every few seconds; unchanged polls skip rebuilding every call record.
+    fn is synchronous (SQLite reads plus record assembly) and runs in the threadpool.
+    With no events at all (version 0), the prebuilt empty result is returned without running fn.
+    """
+    def decorator(fn):
+        cached = {"version": 0, "expires": 0.0, "value": None}
+
+        @wraps(fn)
+        async def wrapper():
+            version = await run_in_threadpool(get_events_version)
+            if not version:
+                return empty
+            async with _dashboard_rebuild_lock:
+                # Checked under the lock: a poll that waited may find the result it needs
+                now = time.monotonic()
+                if cached["version"] < version or now >= cached["expires"]:
+                    cached["value"] = await run_in_threadpool(fn)
+                    cached["version"], cached["expires"] = version, now + ttl
+                return cached["value"]
+        return wrapper
+    return decorator
+
+
+_EMPTY_OVERVIEW = {"total_calls": 0, "conversion_rate": 0, "avg_negotiation_spread": 0, "calls_today": 0, "call_outcomes": {"verified_booked": 0, "verified_no_deal": 0, "failed_verification": 0, "dropped_incomplete": 0}, "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0, "frustrated": 0}}
+_EMPTY_NEGOTIATIONS = {"total_negotiations": 0, "success_rate": 0, "avg_discount": 0, "chart_points": [], "recent_negotiations": []}
+_EMPTY_INSIGHTS = {"repeat_callers": [], "frequent_lanes": []}
 
 
 @app.get("/api/metrics/overview")
-async def api_metrics_overview():
-    call_ids = get_distinct_call_ids()
-    records = []
-    for cid in call_ids:
-        try:
-            rec = _build_call_record(cid)
-            if rec:
-                records.append(rec)
-        except Exception:
-            continue
+@_cached_while_events_unchanged(ttl=2.0, empty=_EMPTY_OVERVIEW)
+def api_metrics_overview():
+    # Outcome and sentiment are derived per record in Python, so they are tallied in one pass
+    # over the (memoized) records; the calls-today count is a plain aggregate done in SQL.
+    records = _build_call_records()
     total = len(records)
-    verified_booked = sum(1 for r in records if r.get("outcome") == "booked")
-    verified_no_deal = sum(1 for r in records if r.get("outcome") == "no_deal")
-    failed_verification = sum(1 for r in records if r.get("outcome") == "failed_verification")
-    dropped_incomplete = sum(1 for r in records if r.get("outcome") == "dropped")
-    conversion_rate = round((verified_booked / total * 100), 1) if total else 0
+    outcomes = Counter()
+    sentiment_distribution = {"positive": 0, "neutral": 0, "negative": 0, "frustrated": 0}
     spreads = []
     for r in records:
+        outcomes[r.get("outcome")] += 1
+        s = r.get("sentiment") or "neutral"
+        if s in sentiment_distribution:
+            sentiment_distribution[s] += 1
         neg, load = r.get("negotiation") or {}, r.get("load_matched") or {}
         lb = safe_number_convert(load.get("loadboard_rate") or load.get("rate"))
         fr = safe_number_convert(neg.get("final_rate"))
         if lb is not None and fr is not None:
             # Premium = final rate above loadboard (positive when carrier negotiated up)
             spreads.append(max(0, float(fr) - float(lb)))
+    verified_booked = outcomes["booked"]
+    verified_no_deal = outcomes["no_deal"]
+    failed_verification = outcomes["failed_verification"]
+    dropped_incomplete = outcomes["dropped"]
+    conversion_rate = round((verified_booked / total * 100), 1) if total else 0
     avg_spread = round(sum(spreads) / len(spreads), 0) if spreads else 0
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(days=1)
-    calls_today = 0
-    for r in records:
-        dt = _parse_timestamp_safe(r.get("timestamp"))
-        if dt is not None and dt > cutoff:
-            calls_today += 1
-    sentiment_distribution = {"positive": 0, "neutral": 0, "negative": 0, "frustrated": 0}
-    for r in records:
-        s = r.get("sentiment") or "neutral"
-        if s in sentiment_distribution:
-            sentiment_distribution[s] += 1
+    calls_today = count_calls_since(datetime.now(timezone.utc) - timedelta(days=1))
     return {"total_calls": total, "conversion_rate": conversion_rate, "avg_negotiation_spread": avg_spread, "calls_today": calls_today, "call_outcomes": {"verified_booked": verified_booked, "verified_no_deal": verified_no_deal, "failed_verification": failed_verification, "dropped_incomplete": dropped_incomplete}, "sentiment_distribution": sentiment_distribution}
 
 
 def _effective_loadboard_rate(load: dict, neg: dict) -> float:
     """Loadboard rate with fallback to negotiation initial/final when missing or zero."""
+    lb = load.get("loadboard_rate")
+    # Assembled records already hold the converted rate, with this same fallback applied
+    if type(lb) is float and lb > 0:
+        return lb
     lb = safe_number_convert(load.get("loadboard_rate") or load.get("rate")) or 0
     if lb > 0:
         return lb
@@ -796,82 +947,76 @@ def _effective_loadboard_rate(load: dict, neg: dict) -> float:
 
 
 @app.get("/api/metrics/negotiations")
-async def api_metrics_negotiations():
-    call_ids = get_distinct_call_ids()
-    records = []
-    for cid in call_ids:
-        try:
-            r = _build_call_record(cid)
-            if r and r.get("negotiation") and r.get("load_matched"):
-                records.append(r)
-        except Exception:
-            continue
-    total = len(records)
-    successes = sum(1 for r in records if (r.get("negotiation") or {}).get("agreed"))
-    success_rate = round((successes / total * 100), 1) if total else 0
+@_cached_while_events_unchanged(ttl=2.0, empty=_EMPTY_NEGOTIATIONS)
+def api_metrics_negotiations():
+    # One pass over the records; the chart (newest 24 priced points) and the recent table
+    # (newest 12) are kept as small bounded heaps instead of sorting every record twice.
+    # The index in each key breaks timestamp ties the way the stable sorts used to.
+    total = successes = 0
     spreads_raw = []
-    for r in records:
-        neg, load = r.get("negotiation") or {}, r.get("load_matched") or {}
-        fr = safe_number_convert(neg.get("final_rate"))
-        if fr is None:
+    chart_heap, recent_heap = [], []
+    # Hot loop: bind globals as locals once; timestamps are only sliced for the 36 kept entries
+    to_number, effective_rate, push, pushpop = safe_number_convert, _effective_loadboard_rate, heapq.heappush, heapq.heappushpop
+    for i, r in enumerate(_build_call_records()):
+        neg, load = r.get("negotiation"), r.get("load_matched")
+        if not (neg and load):
             continue
-        lb = _effective_loadboard_rate(load, neg)
-        if lb > 0:
+        total += 1
+        if neg.get("agreed"):
+            successes += 1
+        ts = r.get("timestamp") or ""
+        fr = to_number(neg.get("final_rate"))
+        lb = effective_rate(load, neg)
+        if fr is not None and lb > 0:
             spreads_raw.append(fr - lb)
+            entry = (ts, i, fr, lb)
+            if len(chart_heap) < 24:
+                push(chart_heap, entry)
+            else:
+                pushpop(chart_heap, entry)
+        entry = (ts, -i, fr or 0, lb, r)
+        if len(recent_heap) < 12:
+            push(recent_heap, entry)
+        else:
+            pushpop(recent_heap, entry)
+    success_rate = round((successes / total * 100), 1) if total else 0
     avg_discount = round(sum(spreads_raw) / len(spreads_raw), 0) if spreads_raw else 0
-    chart_points = []
-    for r in sorted(records, key=lambda x: x.get("timestamp") or ""):
-        neg, load = r.get("negotiation") or {}, r.get("load_matched") or {}
-        fr = safe_number_convert(neg.get("final_rate"))
-        lb = _effective_loadboard_rate(load, neg)
-        if fr is not None and lb > 0:
-            chart_points.append({"date": (r.get("timestamp") or "")[:10], "loadboard_rate": lb, "final_rate": fr})
-    chart_points = chart_points[-24:]
+    chart_points = [{"date": ts[:10], "loadboard_rate": lb, "final_rate": fr} for ts, _, fr, lb in sorted(chart_heap)]
     recent = []
-    for r in sorted(records, key=lambda x: x.get("timestamp") or "", reverse=True)[:12]:
-        neg, load = r.get("negotiation") or {}, r.get("load_matched") or {}
-        lb = _effective_loadboard_rate(load, neg)
-        fr = safe_number_convert(neg.get("final_rate")) or 0
-        lane = f"{load.get('origin', '')} → {load.get('destination', '')}" if load else "—"
+    for ts, _, fr, lb, r in sorted(recent_heap, reverse=True):
+        neg, load = r["negotiation"], r["load_matched"]
+        lane = f"{load.get('origin', '')} → {load.get('destination', '')}"
         spread = max(0, fr - lb)
-        recent.append({"date": (r.get("timestamp") or "")[:19].replace("T", " "), "load_id": load.get("load_id") or "—", "lane": lane, "loadboard_rate": lb, "final_rate": fr, "spread": spread, "rounds": neg.get("rounds") or 0, "outcome": "agreed" if neg.get("agreed") else "declined"})
+        recent.append({"date": ts[:19].replace("T", " "), "load_id": load.get("load_id") or "—", "lane": lane, "loadboard_rate": lb, "final_rate": fr, "spread": spread, "rounds": neg.get("rounds") or 0, "outcome": "agreed" if neg.get("agreed") else "declined"})
     return {"total_negotiations": total, "success_rate": success_rate, "avg_discount": avg_discount, "chart_points": chart_points, "recent_negotiations": recent}
 
 
 @app.get("/api/carriers/insights")
-async def api_carriers_insights():
-    call_ids = get_distinct_call_ids()
-    records = []
-    for cid in call_ids:
-        try:
-            r = _build_call_record(cid)
-            if r:
-                records.append(r)
-        except Exception:
-            continue
-    mc_counts, mc_name, mc_lanes = {}, {}, {}
-    for r in records:
+@_cached_while_events_unchanged(ttl=2.0, empty=_EMPTY_INSIGHTS)
+def api_carriers_insights():
+    # MC number, carrier name and lane come from per-call fallbacks across several event types,
+    # so they are gathered in one pass over the (memoized) records; Counter.most_common picks
+    # the top 8 with a bounded heap instead of sorting every MC and lane.
+    mc_counts, lane_counts = Counter(), Counter()
+    mc_name, mc_lanes = {}, {}
+    for r in _build_call_records():
         mc = r.get("mc_number") or "—"
-        mc_counts[mc] = mc_counts.get(mc, 0) + 1
+        mc_counts[mc] += 1
         mc_name[mc] = r.get("carrier_name") or "Unknown"
         load = r.get("load_matched") or {}
         if load.get("origin") and load.get("destination"):
             lane = f"{load['origin']} → {load['destination']}"
-            mc_lanes.setdefault(mc, []).append(lane)
-    repeat_callers = [{"mc_number": mc, "carrier_name": mc_name[mc], "call_count": n, "typical_lanes": list(dict.fromkeys(mc_lanes.get(mc, [])))[:3]} for mc, n in sorted(mc_counts.items(), key=lambda x: -x[1]) if n > 1][:8]
-    lane_counts = {}
-    for r in records:
-        load = r.get("load_matched") or {}
-        if load.get("origin") and load.get("destination"):
-            lane = f"{load['origin']} → {load['destination']}"
-            lane_counts[lane] = lane_counts.get(lane, 0) + 1
-    frequent_lanes = [{"lane": k, "call_count": v} for k, v in sorted(lane_counts.items(), key=lambda x: -x[1])[:8]]
+            lane_counts[lane] += 1
+            typical = mc_lanes.setdefault(mc, {})
+            if len(typical) < 3:
+                typical[lane] = None
+    repeat_callers = [{"mc_number": mc, "carrier_name": mc_name[mc], "call_count": n, "typical_lanes": list(mc_lanes.get(mc, ()))} for mc, n in mc_counts.most_common(8) if n > 1]
+    frequent_lanes = [{"lane": k, "call_count": v} for k, v in lane_counts.most_common(8)]
     return {"repeat_callers": repeat_callers, "frequent_lanes": frequent_lanes}
 
 
-@app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard():
-    return """
+# Static page: encoded and hashed once at import rather than per request
+_DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -941,4 +1086,12 @@ async def dashboard():
     </div>
 </body>
 </html>
-"""
+""".encode()
+_DASHBOARD_ETAG = '"' + hashlib.blake2b(_DASHBOARD_HTML, digest_size=8).hexdigest() + '"'
+
+
+@app.get("/dashboard", response_class=HTMLResponse)
+async def dashboard(request: Request):
+    if request.headers.get("if-none-match") == _DASHBOARD_ETAG:
+        return Response(status_code=304, headers={"ETag": _DASHBOARD_ETAG})
+    return HTMLResponse(content=_DASHBOARD_HTML, headers={"Cache-Control": "public, max-age=60", "ETag": _DASHBOARD_ETAG})
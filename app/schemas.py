@@ -5,7 +5,20 @@ These models define the structure of loads, requests, and responses.
 """
 
 from typing import Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+def _number_or_none(value, cast):
+    """Numbers pass through; "40000"-style strings are converted, blank or unparseable ones become None."""
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            return None
+    return value
 
 
 class Load(BaseModel):
@@ -14,6 +27,9 @@ class Load(BaseModel):
     
     All fields follow the exact naming convention required for the workflow builder.
     """
+    # No route validates or returns these directly (endpoints pass load dicts through), so
+    # pydantic builds the core schema on first use instead of at import
+    model_config = ConfigDict(defer_build=True)
     
     load_id: str = Field(
         ...,
@@ -83,6 +99,7 @@ class Load(BaseModel):
 
 class LoadsResponse(BaseModel):
     """Response model for search_loads endpoint."""
+    model_config = ConfigDict(defer_build=True)
     loads: list[Load] = Field(
         ...,
         description="List of matching loads"
@@ -282,13 +299,25 @@ class SetCarrierPrefsRequest(BaseModel):
     mc_number: str = Field(..., description="Motor Carrier number")
     home_city: Optional[str] = Field(None, description="Home city")
     home_state: Optional[str] = Field(None, description="Home state")
-    home_lat: Optional[Union[str, float]] = Field(None, description="Home latitude")
-    home_lng: Optional[Union[str, float]] = Field(None, description="Home longitude")
+    home_lat: Optional[float] = Field(None, description="Home latitude")
+    home_lng: Optional[float] = Field(None, description="Home longitude")
     equipment_type: Optional[str] = Field(None, description="Equipment type (VAN, REEFER, FLATBED)")
-    min_temp: Optional[Union[str, float]] = Field(None, description="Minimum temperature (accepts string or number)")
-    max_temp: Optional[Union[str, float]] = Field(None, description="Maximum temperature (accepts string or number)")
-    origin_radius_miles: Optional[Union[str, int]] = Field(None, description="Origin search radius in miles")
-    dest_radius_miles: Optional[Union[str, int]] = Field(None, description="Destination search radius in miles")
+    min_temp: Optional[float] = Field(None, description="Minimum temperature (accepts string or number)")
+    max_temp: Optional[float] = Field(None, description="Maximum temperature (accepts string or number)")
+    origin_radius_miles: Optional[int] = Field(None, description="Origin search radius in miles")
+    dest_radius_miles: Optional[int] = Field(None, description="Destination search radius in miles")
+
+    # Plain numeric fields with a string pre-pass, rather than str/number unions that
+    # pydantic would try member by member on every request
+    @field_validator("home_lat", "home_lng", "min_temp", "max_temp", mode="before")
+    @classmethod
+    def _parse_float(cls, value):
+        return _number_or_none(value, float)
+
+    @field_validator("origin_radius_miles", "dest_radius_miles", mode="before")
+    @classmethod
+    def _parse_int(cls, value):
+        return _number_or_none(value, int)
 
 
 class SetCallSearchPrefsRequest(BaseModel):
@@ -303,17 +332,27 @@ class SetCallSearchPrefsRequest(BaseModel):
     departure_date: Optional[str] = Field(None, description="Earliest departure date - when carrier is leaving current location (ISO 8601)")
     latest_departure_date: Optional[str] = Field(None, description="Latest departure date - flexibility window (ISO 8601)")
     equipment_type: Optional[str] = Field(None, description="Equipment type")
-    weight_capacity: Optional[Union[str, int]] = Field(None, description="Weight capacity in pounds (accepts string or number)")
-    origin_lat: Optional[Union[str, float]] = Field(None, description="Origin latitude")
-    origin_lng: Optional[Union[str, float]] = Field(None, description="Origin longitude")
-    origin_radius_miles: Optional[Union[str, int]] = Field(None, description="Origin search radius in miles")
-    dest_lat: Optional[Union[str, float]] = Field(None, description="Destination latitude")
-    dest_lng: Optional[Union[str, float]] = Field(None, description="Destination longitude")
-    dest_radius_miles: Optional[Union[str, int]] = Field(None, description="Destination search radius in miles")
-    min_temp: Optional[Union[str, float]] = Field(None, description="Minimum temperature (accepts string or number)")
-    max_temp: Optional[Union[str, float]] = Field(None, description="Maximum temperature (accepts string or number)")
+    weight_capacity: Optional[int] = Field(None, description="Weight capacity in pounds (accepts string or number)")
+    origin_lat: Optional[float] = Field(None, description="Origin latitude")
+    origin_lng: Optional[float] = Field(None, description="Origin longitude")
+    origin_radius_miles: Optional[int] = Field(None, description="Origin search radius in miles")
+    dest_lat: Optional[float] = Field(None, description="Destination latitude")
+    dest_lng: Optional[float] = Field(None, description="Destination longitude")
+    dest_radius_miles: Optional[int] = Field(None, description="Destination search radius in miles")
+    min_temp: Optional[float] = Field(None, description="Minimum temperature (accepts string or number)")
+    max_temp: Optional[float] = Field(None, description="Maximum temperature (accepts string or number)")
     notes: Optional[str] = Field(None, description="Additional notes or special requirements")
 
+    @field_validator("origin_lat", "origin_lng", "dest_lat", "dest_lng", "min_temp", "max_temp", mode="before")
+    @classmethod
+    def _parse_float(cls, value):
+        return _number_or_none(value, float)
+
+    @field_validator("weight_capacity", "origin_radius_miles", "dest_radius_miles", mode="before")
+    @classmethod
+    def _parse_int(cls, value):
+        return _number_or_none(value, int)
+
 
 class GetBestLoadRequest(BaseModel):
     """Request model for getting the best load for negotiation."""
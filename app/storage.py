@@ -1,16 +1,135 @@
-import os
-import sqlite3
 import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
+from typing import Optional
+
+import orjson
+from cachetools import TTLCache
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(settings.DB_PATH or str(Path(__file__).parent.parent / "events.db"))
+
+# Pool of long-lived connections (warm page cache, no per-request open/close).
+# Connections are handed to one thread at a time, so check_same_thread is off.
+POOL_MIN_SIZE = 5  # /api/live-data runs five reads concurrently
+POOL_MAX_SIZE = 10
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=POOL_MAX_SIZE)
+
+# Applied once per physical connection. WAL lets dashboard reads run alongside event
+# writes; synchronous=NORMAL drops the per-commit fsync (safe under WAL).
+_CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.executescript(_CONNECTION_PRAGMAS)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def open_pool():
+    """Pre-open POOL_MIN_SIZE connections (call on app startup)."""
+    while _pool.qsize() < POOL_MIN_SIZE:
+        _pool.put_nowait(_connect())
+
+
+def close_pool():
+    """Close all idle pooled connections (call on app shutdown)."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        # Recommended before closing: uses what this connection's queries taught the planner
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
 
-DB_PATH = Path(os.environ.get("DB_PATH", str(Path(__file__).parent.parent / "events.db")))
+
+# Events are queued by log_event and written in batches (one transaction per batch)
+# by a background thread, so webhook handlers don't pay a commit per event.
+EVENT_FLUSH_INTERVAL = 0.05
+# The writer also runs PRAGMA optimize this often (seconds), so statistics keep up with
+# a long-running server's data and not only with what existed at the last migration
+OPTIMIZE_INTERVAL = 3600
+_event_queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+_flush_lock = threading.Lock()
+# A batch whose INSERT failed (e.g. "database is locked"); written ahead of newer events next flush
+_unwritten: list = []
+_writer: threading.Thread | None = None
+_writer_stop = threading.Event()
+_flush_listeners: list = []
+
+
+# Profile/prefs rows are read on every summary but change rarely; upserts evict their key.
+# Cached dicts are shared between callers and must not be mutated. Reads also happen on
+# threadpool workers, so access goes through _row_cache_lock.
+_carrier_profile_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+_call_prefs_cache: TTLCache = TTLCache(maxsize=2048, ttl=30)
+_row_cache_lock = threading.Lock()
+_MISSING = object()
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection (rows are sqlite3.Row). Opens a new one if the pool is empty."""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+# PRAGMA user_version of a database with every table, index and column below. Bump it
+# whenever init_db gains a schema change, so existing databases run it once more.
+SCHEMA_VERSION = 3
 
 
 def init_db():
-    """Initialize SQLite database with all tables."""
-    conn = sqlite3.connect(DB_PATH)
+    """Initialize SQLite database with all tables (a single PRAGMA read once the schema is current)."""
+    # Same PRAGMAs as pooled connections; journal_mode=WAL is persistent, so the database
+    # file is in WAL mode from creation for every connection that opens it later
+    conn = _connect()
     cursor = conn.cursor()
+    if cursor.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        conn.close()
+        return
+    # Workers starting together: the first takes the write lock and migrates, the rest
+    # re-check the version once it commits
+    cursor.execute("BEGIN IMMEDIATE")
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        conn.rollback()
+        conn.close()
+        return
     
     # Events table
     cursor.execute("""
@@ -23,6 +142,12 @@ def init_db():
         )
     """)
     
+    # Per-call lookups (latest event of a type, a call's timeline) and latest-of-type scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_call_type_id ON events(call_id, event_type, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_type_id ON events(event_type, id DESC)")
+    # A call's timeline in id order (no sort step) and per-call MAX(id) from a narrow covering index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_call_id_id ON events(call_id, id)")
+    
     # Carrier profiles table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS carrier_profiles (
@@ -71,7 +196,42 @@ def init_db():
         )
     """)
     
+    # Newest event id per call, kept by a trigger so call listings read one row per call
+    # instead of grouping the whole events table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            call_id TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_calls_last_event_id ON calls(last_event_id DESC)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_events_calls AFTER INSERT ON events
+        BEGIN
+            INSERT INTO calls (call_id, last_event_id) VALUES (NEW.call_id, NEW.id)
+            ON CONFLICT(call_id) DO UPDATE SET last_event_id = excluded.last_event_id;
+        END
+    """)
+    if version < 3:
+        cursor.execute("""
+            INSERT OR REPLACE INTO calls (call_id, last_event_id)
+            SELECT call_id, MAX(id) FROM events GROUP BY call_id
+        """)
+    
+    # Assembled dashboard records per call (a projection of events, rebuilt when a call's
+    # newest event id or the record format changes); shared by every worker process
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_records (
+            call_id TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL,
+            format INTEGER NOT NULL,
+            record BLOB NOT NULL,
+            search_text TEXT NOT NULL
+        )
+    """)
+    
     # Add new columns to existing tables (safe migration)
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(call_search_prefs)")}
     for column_def in [
         ("departure_date", "TEXT"),
         ("latest_departure_date", "TEXT"),
@@ -80,84 +240,204 @@ def init_db():
         ("min_temp", "REAL"),
         ("max_temp", "REAL")
     ]:
-        try:
+        if column_def[0] not in existing_columns:
             cursor.execute(f"ALTER TABLE call_search_prefs ADD COLUMN {column_def[0]} {column_def[1]}")
-        except Exception:
-            pass  # Column already exists
+    
+    # v1: payloads that were stored as JSON strings wrapping an object are unwrapped in place
+    # (repeated for multiply-encoded rows), so readers can decode every payload once.
+    if version < 1:
+        while cursor.execute("""
+            UPDATE events SET payload = json_extract(payload, '$')
+            WHERE json_valid(payload) AND json_type(payload) = 'text'
+              AND json_valid(json_extract(payload, '$')) AND json_type(json_extract(payload, '$')) IN ('object', 'text')
+        """).rowcount:
+            pass
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     
     conn.commit()
+    # Refresh planner statistics so the composite indexes above are picked
+    cursor.execute("ANALYZE")
     conn.close()
 
 
+def _unwrap_payload(payload):
+    """Decode payloads sent as JSON strings (possibly encoded more than once) so objects are stored as objects."""
+    while isinstance(payload, str):
+        try:
+            decoded = orjson.loads(payload)
+        except ValueError:
+            break
+        if not isinstance(decoded, (dict, str)):
+            break  # e.g. "42" or "true": keep the caller's string
+        payload = decoded
+    return payload
+
+
 def log_event(call_id: str, event_type: str, payload: dict) -> bool:
-    """Log an event to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO events (call_id, event_type, payload, timestamp) VALUES (?, ?, ?, ?)",
-        (call_id, event_type, json.dumps(payload), datetime.utcnow().isoformat() + "Z"),
-    )
-    conn.commit()
-    conn.close()
+    """Log an event to the database (queued for the event writer when it is running)."""
+    payload = _unwrap_payload(payload)
+    # Stored as TEXT (SQLite's JSON functions reject BLOBs); non-str keys stringified like json.dumps did
+    try:
+        payload_json = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        payload_json = json.dumps(payload)  # e.g. integers wider than 64 bits, which orjson rejects
+    _event_queue.put((call_id, event_type, payload_json, datetime.utcnow().isoformat() + "Z"))
+    if _writer is None:
+        flush_events()  # no background writer (scripts, CLI): write through
     return True
 
 
+def flush_events() -> int:
+    """Write all queued events in one transaction. Returns the number written.
+
+    Readers of the events table call this first so they see every logged event. If the
+    INSERT fails the batch is kept, to be written ahead of newer events on the next flush,
+    and the error is re-raised; listeners only run after a commit.
+    """
+    with _flush_lock:
+        batch = _unwritten[:]
+        _unwritten.clear()
+        while True:
+            try:
+                batch.append(_event_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+        try:
+            with connection() as conn, conn:
+                conn.executemany(
+                    "INSERT INTO events (call_id, event_type, payload, timestamp) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+        except Exception:
+            _unwritten[:] = batch  # log_event already reported these as logged; keep them for the retry
+            raise
+        for listener in _flush_listeners:
+            listener()
+        return len(batch)
+
+
+def add_flush_listener(listener):
+    """Register a no-argument callable run after each batch of events commits (e.g. to drop a cache)."""
+    _flush_listeners.append(listener)
+
+
+def optimize():
+    """Let SQLite refresh planner statistics that have gone stale (cheap; usually a no-op)."""
+    with connection() as conn:
+        conn.execute("PRAGMA optimize")
+
+
+def _run_event_writer():
+    next_optimize = time.monotonic() + OPTIMIZE_INTERVAL
+    while not _writer_stop.wait(EVENT_FLUSH_INTERVAL):
+        try:
+            flush_events()
+        except sqlite3.Error:
+            logger.exception("Failed to write queued events")
+        if time.monotonic() >= next_optimize:
+            next_optimize = time.monotonic() + OPTIMIZE_INTERVAL
+            try:
+                optimize()
+            except sqlite3.Error:
+                logger.exception("PRAGMA optimize failed")
+
+
+def start_event_writer():
+    """Start the background event writer (call on app startup)."""
+    global _writer
+    if _writer is None:
+        _writer_stop.clear()
+        _writer = threading.Thread(target=_run_event_writer, name="event-writer", daemon=True)
+        _writer.start()
+
+
+def stop_event_writer():
+    """Stop the background event writer and flush what is still queued (call on app shutdown)."""
+    global _writer
+    if _writer is not None:
+        _writer_stop.set()
+        _writer.join()
+        _writer = None
+    flush_events()
+
+
+# Columns upserts may set (besides the key and updated_at); other keys in updates are rejected,
+# since column names are interpolated into the SQL
+_UPSERT_COLUMNS = {
+    "carrier_profiles": frozenset((
+        "dot_number", "legal_name", "physical_city", "physical_state", "home_lat", "home_lng",
+        "equipment_type", "min_temp", "max_temp", "origin_radius_miles", "dest_radius_miles",
+    )),
+    "call_search_prefs": frozenset((
+        "mc_number", "origin_city", "origin_state", "destination_city", "destination_state",
+        "pickup_date", "departure_date", "latest_departure_date", "equipment_type", "weight_capacity",
+        "origin_lat", "origin_lng", "origin_radius_miles", "dest_lat", "dest_lng", "dest_radius_miles",
+        "min_temp", "max_temp", "notes",
+    )),
+}
+
+
+@lru_cache(maxsize=64)
+def _upsert_sql(table: str, key_column: str, columns: tuple) -> str:
+    """
+    UPSERT statement for one set of provided columns, built once per shape. Only provided
+    columns are inserted, so a new row still gets column defaults for the rest.
+    """
+    assignments = ", ".join(
+        f"{col} = excluded.{col}" if col == "updated_at" else f"{col} = COALESCE(excluded.{col}, {table}.{col})"
+        for col in columns
+    )
+    return (
+        f"INSERT INTO {table} ({key_column}, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+        f"ON CONFLICT({key_column}) DO UPDATE SET {assignments} RETURNING *"
+    )
+
+
+def _upsert_row(table: str, key_column: str, key: str, updates: dict) -> Optional[sqlite3.Row]:
+    """
+    Insert the row, or update an existing one in the same statement: None values in updates
+    keep the stored value (COALESCE), updated_at always changes. Returns the full row.
+    """
+    updates["updated_at"] = datetime.utcnow().isoformat()
+    columns = tuple(col for col in updates if col != key_column)
+    unknown = set(columns) - _UPSERT_COLUMNS[table] - {"updated_at"}
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(sorted(unknown))}")
+    with connection() as conn:
+        row = conn.execute(_upsert_sql(table, key_column, columns), [key, *(updates[col] for col in columns)]).fetchone()
+        conn.commit()
+    return row
+
+
 def upsert_carrier_profile(mc_number: str, updates: dict) -> dict:
     """
     Upsert carrier profile.
     Only updates provided fields (keeps existing user-entered data).
     Returns the full carrier profile row.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Check if carrier exists
-    cursor.execute("SELECT * FROM carrier_profiles WHERE mc_number = ?", (mc_number,))
-    existing = cursor.fetchone()
-    
-    updates["updated_at"] = datetime.utcnow().isoformat()
-    
-    if existing:
-        # Update only provided fields
-        set_clauses = []
-        params = []
-        for key, value in updates.items():
-            if value is not None or key == "updated_at":
-                set_clauses.append(f"{key} = ?")
-                params.append(value)
-        
-        if set_clauses:
-            params.append(mc_number)
-            sql = f"UPDATE carrier_profiles SET {', '.join(set_clauses)} WHERE mc_number = ?"
-            cursor.execute(sql, params)
-    else:
-        # Insert new carrier
-        updates["mc_number"] = mc_number
-        columns = list(updates.keys())
-        placeholders = ["?" for _ in columns]
-        sql = f"INSERT INTO carrier_profiles ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(sql, [updates[col] for col in columns])
-    
-    conn.commit()
-    
-    # Return updated row
-    cursor.execute("SELECT * FROM carrier_profiles WHERE mc_number = ?", (mc_number,))
-    row = cursor.fetchone()
-    conn.close()
+    row = _upsert_row("carrier_profiles", "mc_number", mc_number, updates)
+    with _row_cache_lock:
+        _carrier_profile_cache.pop(mc_number, None)
     
     return dict(row) if row else {}
 
 
 def get_carrier_profile(mc_number: str) -> dict:
-    """Get carrier profile by MC number."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM carrier_profiles WHERE mc_number = ?", (mc_number,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    """Get carrier profile by MC number (cached briefly; see _carrier_profile_cache)."""
+    with _row_cache_lock:
+        cached = _carrier_profile_cache.get(mc_number, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM carrier_profiles WHERE mc_number = ?", (mc_number,))
+        row = cursor.fetchone()
+    result = dict(row) if row else None
+    with _row_cache_lock:
+        _carrier_profile_cache[mc_number] = result
+    return result
 
 
 def upsert_call_search_prefs(call_id: str, updates: dict) -> dict:
@@ -166,91 +446,160 @@ def upsert_call_search_prefs(call_id: str, updates: dict) -> dict:
     Only updates provided fields.
     Returns the full call_search_prefs row.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Check if call prefs exist
-    cursor.execute("SELECT * FROM call_search_prefs WHERE call_id = ?", (call_id,))
-    existing = cursor.fetchone()
-    
-    updates["updated_at"] = datetime.utcnow().isoformat()
-    
-    if existing:
-        # Update only provided fields
-        set_clauses = []
-        params = []
-        for key, value in updates.items():
-            if value is not None or key == "updated_at":
-                set_clauses.append(f"{key} = ?")
-                params.append(value)
-        
-        if set_clauses:
-            params.append(call_id)
-            sql = f"UPDATE call_search_prefs SET {', '.join(set_clauses)} WHERE call_id = ?"
-            cursor.execute(sql, params)
-    else:
-        # Insert new call prefs
-        updates["call_id"] = call_id
-        columns = list(updates.keys())
-        placeholders = ["?" for _ in columns]
-        sql = f"INSERT INTO call_search_prefs ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(sql, [updates[col] for col in columns])
-    
-    conn.commit()
-    
-    # Return updated row
-    cursor.execute("SELECT * FROM call_search_prefs WHERE call_id = ?", (call_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = _upsert_row("call_search_prefs", "call_id", call_id, updates)
+    with _row_cache_lock:
+        _call_prefs_cache.pop(call_id, None)
     
     return dict(row) if row else {}
 
 
 def get_call_search_prefs(call_id: str) -> dict:
-    """Get call search preferences by call_id."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM call_search_prefs WHERE call_id = ?", (call_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    """Get call search preferences by call_id (cached briefly; see _call_prefs_cache)."""
+    with _row_cache_lock:
+        cached = _call_prefs_cache.get(call_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM call_search_prefs WHERE call_id = ?", (call_id,))
+        row = cursor.fetchone()
+    result = dict(row) if row else None
+    with _row_cache_lock:
+        _call_prefs_cache[call_id] = result
+    return result
 
 
-def get_distinct_call_ids():
-    """Return all distinct call_id values from events, most recent first. Excludes empty/unknown."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT call_id FROM events
-        WHERE call_id IS NOT NULL AND TRIM(call_id) != '' AND call_id != 'unknown'
-        GROUP BY call_id
-        ORDER BY MAX(id) DESC
-    """)
-    out = [row[0] for row in cursor.fetchall()]
-    conn.close()
+# Calls shown on the dashboard (empty and "unknown" call ids are left out)
+_LISTED_CALLS = "call_id IS NOT NULL AND TRIM(call_id) != '' AND call_id != 'unknown'"
+
+
+def get_top_mc_numbers(limit: int) -> list:
+    """Most frequently verified MC numbers (from verify_mc_requested events), most frequent first."""
+    flush_events()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT json_extract(payload, '$.mc_number') AS mc, COUNT(*) AS n
+            FROM events
+            WHERE event_type = 'verify_mc_requested' AND mc IS NOT NULL AND mc != ''
+            GROUP BY mc
+            ORDER BY n DESC
+            LIMIT ?
+        """, (limit,))
+        out = [row[0] for row in cursor.fetchall()]
     return out
 
 
-def get_events_by_call_id(call_id: str):
-    """Return all events for a call_id: list of dicts with event_type, payload, timestamp."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT event_type, payload, timestamp
-        FROM events
-        WHERE call_id = ?
-        ORDER BY id ASC
-    """, (call_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [
-        {"event_type": r["event_type"], "payload": r["payload"], "timestamp": r["timestamp"]}
-        for r in rows
-    ]
+def _query_event_digests(event_types: tuple, where: str, params: tuple) -> dict:
+    """
+    Per-call, per-type digest of the events matching `where`, aggregated in SQL: one row per
+    distinct (call, event type) rather than every event. Event types are compared with
+    surrounding whitespace/quotes stripped.
+    
+    Returns {call_id: (first_timestamp, last_timestamp, {event_type: {"payload", "timestamp"}})},
+    most recently active call first; each type holds its latest event (payload only for event_types).
+    """
+    flush_events()
+    placeholders = ", ".join("?" * len(event_types))
+    with connection() as conn:
+        rows = conn.execute(f"""
+            SELECT call_id, kind, CASE WHEN kind IN ({placeholders}) THEN payload END AS payload, timestamp, first_ts, last_ts
+            FROM (
+                SELECT call_id, TRIM(TRIM(event_type), '"') AS kind, payload, timestamp,
+                       ROW_NUMBER() OVER (PARTITION BY call_id, TRIM(TRIM(event_type), '"') ORDER BY id DESC) AS rn,
+                       FIRST_VALUE(timestamp) OVER calls AS first_ts,
+                       LAST_VALUE(timestamp) OVER calls AS last_ts,
+                       MAX(id) OVER (PARTITION BY call_id) AS last_id
+                FROM events
+                WHERE {where}
+                WINDOW calls AS (PARTITION BY call_id ORDER BY id ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            )
+            WHERE rn = 1
+            ORDER BY last_id DESC, call_id
+        """, (*event_types, *params)).fetchall()
+    digests = {}
+    for call_id, group in groupby(rows, key=itemgetter("call_id")):
+        group = list(group)
+        by_type = {r["kind"]: {"payload": r["payload"], "timestamp": r["timestamp"]} for r in group if r["kind"]}
+        digests[call_id] = (group[0]["first_ts"], group[0]["last_ts"], by_type)
+    return digests
+
+
+def get_call_event_digest(call_id: str, event_types: tuple):
+    """Event digest (see _query_event_digests) for one call, or None if the call has no events."""
+    return _query_event_digests(event_types, "call_id = ?", (call_id,)).get(call_id)
+
+
+def get_call_event_digests(event_types: tuple, call_ids: Optional[list] = None) -> dict:
+    """Event digests for the given calls, or every listed call (most recently active first), in one query."""
+    if call_ids is None:
+        return _query_event_digests(event_types, _LISTED_CALLS, ())
+    return _query_event_digests(event_types, f"call_id IN ({', '.join('?' * len(call_ids))})", tuple(call_ids))
+
+
+def get_call_versions() -> dict:
+    """{call_id: id of its newest event} for every listed call, most recently active first."""
+    flush_events()
+    with connection() as conn:
+        return dict(conn.execute(f"SELECT call_id, last_event_id FROM calls WHERE {_LISTED_CALLS} ORDER BY last_event_id DESC").fetchall())
+
+
+def count_calls_since(cutoff: datetime) -> int:
+    """Number of listed calls whose first event is later than cutoff (aware or naive UTC)."""
+    flush_events()
+    with connection() as conn:
+        return conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM events
+                WHERE {_LISTED_CALLS}
+                GROUP BY call_id
+                HAVING julianday(MIN(timestamp)) > julianday(?)
+            )
+        """, (cutoff.isoformat(),)).fetchone()[0]
+
+
+def get_all_call_search_prefs() -> dict:
+    """All call search preferences keyed by call_id."""
+    with connection() as conn:
+        return {row["call_id"]: dict(row) for row in conn.execute("SELECT * FROM call_search_prefs")}
+
+
+def get_stored_call_records(call_ids: Optional[list], record_format: int) -> dict:
+    """{call_id: (last_event_id, record, search_text)} from call_records, for the given calls or all."""
+    where, params = "format = ?", (record_format,)
+    if call_ids is not None:
+        where += f" AND call_id IN ({', '.join('?' * len(call_ids))})"
+        params += tuple(call_ids)
+    with connection() as conn:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute(f"SELECT call_id, last_event_id, record, search_text FROM call_records WHERE {where}", params)
+        }
+
+
+def save_call_records(rows: list) -> None:
+    """Upsert (call_id, last_event_id, format, record, search_text) rows into call_records."""
+    if not rows:
+        return
+    with connection() as conn:
+        conn.executemany("""
+            INSERT INTO call_records (call_id, last_event_id, format, record, search_text) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(call_id) DO UPDATE SET
+                last_event_id = excluded.last_event_id, format = excluded.format,
+                record = excluded.record, search_text = excluded.search_text
+            WHERE excluded.last_event_id >= call_records.last_event_id
+        """, rows)
+        conn.commit()
+
+
+def get_events_version() -> int:
+    """Id of the newest event (0 if none): changes whenever an event is written, by any process."""
+    flush_events()
+    with connection() as conn:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
 
 
-# Initialize DB on module import
-init_db()
+# A brand-new database gets its tables right away (scripts, CLI); the app runs init_db in
+# its lifespan, which is a single PRAGMA read once the schema is current
+if not DB_PATH.exists():
+    init_db()